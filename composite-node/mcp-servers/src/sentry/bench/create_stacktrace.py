@@ -0,0 +1,62 @@
+"""Microbenchmark: create_stacktrace on a synthetic 5,000-frame event.
+
+Renders an event with one exception of --frames frames, each with 11 context
+lines and every tenth frame in-app, using the default limits and with every
+limit disabled. Reports the time per render and the size of the output.
+
+Usage: python bench/create_stacktrace.py [--frames 5000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from mcp_server_sentry.server import create_stacktrace
+
+
+def synthetic_event(frame_count: int) -> dict:
+    frames = []
+    for i in range(frame_count):
+        lineno = 100 + i % 50
+        frames.append({
+            "filename": f"app/module_{i % 97}.py" if i % 10 == 0 else f"site-packages/lib/module_{i % 89}.py",
+            "lineNo": lineno,
+            "function": f"function_{i}",
+            "inApp": i % 10 == 0,
+            "context": [[lineno + offset, f"    line {lineno + offset} of frame {i}" + " " * 40] for offset in range(-5, 6)],
+        })
+    return {
+        "entries": [{
+            "type": "exception",
+            "data": {"values": [{"type": "RecursionError", "value": "maximum recursion depth exceeded", "stacktrace": {"frames": frames}}]},
+        }]
+    }
+
+
+def measure(event: dict, repeat: int, **limits) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = create_stacktrace(event, **limits)
+    return (time.perf_counter() - start) / repeat, len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='create_stacktrace microbenchmark')
+    parser.add_argument('--frames', type=int, default=5000, help='Frames in the synthetic event')
+    parser.add_argument('--repeat', type=int, default=20, help='Renders per measurement')
+    args = parser.parse_args()
+
+    event = synthetic_event(args.frames)
+    print(f"{'limits':>10}  {'ms/render':>10}  {'chars':>10}")
+    for label, limits in (
+        ("default", {}),
+        ("none", {"max_frames": None, "max_context_lines": None, "max_chars": None}),
+    ):
+        seconds, chars = measure(event, args.repeat, **limits)
+        print(f"{label:>10}  {seconds * 1000:>10.2f}  {chars:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 import asyncio
-from dataclasses import dataclass
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Iterator
 from urllib.parse import urlparse
 
 import click
@@ -11,6 +15,34 @@ from mcp.shared.exceptions import McpError
 import mcp.server.stdio
 
 SENTRY_API_BASE = "https://sentry.io/api/0/"
+
+# Connection pool and timeouts for the shared Sentry HTTP client
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 30.0
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 30.0
+
+# Issues fetched at once by get_sentry_issues
+MAX_CONCURRENT_ISSUE_FETCHES = 8
+
+# Cached issues are served without a request for ISSUE_CACHE_TTL seconds, then
+# revalidated with conditional requests when Sentry sent ETags
+ISSUE_CACHE_TTL = 30.0
+ISSUE_CACHE_MAX_ENTRIES = 256
+
+# Issues returned by the list and search tools when no limit is given, and the
+# most they may ask for (Sentry pages hold at most 100 issues)
+DEFAULT_ISSUE_LIST_LIMIT = 25
+MAX_ISSUE_LIST_LIMIT = 500
+MAX_ISSUES_PER_PAGE = 100
+
+# Limits on the stacktrace rendered for an issue, to bound the LLM context it uses
+MAX_FRAMES = 30
+MAX_CONTEXT_LINES = 5
+MAX_STACKTRACE_CHARS = 20000
+STACKTRACE_TRUNCATED = "\n... stacktrace truncated ...\n"
+
 MISSING_AUTH_TOKEN_MESSAGE = (
     """Sentry authentication token not found. Please specify your Sentry auth token."""
 )
@@ -58,6 +90,10 @@ class SentryError(Exception):
     pass
 
 
+def mcp_error(message: str) -> McpError:
+    return McpError(types.ErrorData(code=types.INTERNAL_ERROR, message=message))
+
+
 def extract_issue_id(issue_id_or_url: str) -> str:
     """
     Extracts the Sentry issue ID from either a full URL or a standalone ID.
@@ -90,7 +126,97 @@ def extract_issue_id(issue_id_or_url: str) -> str:
     return issue_id
 
 
-def create_stacktrace(latest_event: dict) -> str:
+def select_frames(frames: list[dict], max_frames: int | None) -> list[int]:
+    """
+    Picks the indices of the frames to render, in their original order.
+
+    When there are more than `max_frames` frames, in-app frames are kept first,
+    most recent (last) first, and the remaining slots go to the most recent
+    other frames.
+    """
+    if max_frames is None or len(frames) <= max_frames:
+        return list(range(len(frames)))
+
+    in_app = [i for i in range(len(frames) - 1, -1, -1) if frames[i].get("inApp")]
+    selected = set(in_app[:max_frames])
+    for i in range(len(frames) - 1, -1, -1):
+        if len(selected) >= max_frames:
+            break
+        selected.add(i)
+    return [i for i in range(len(frames)) if i in selected]
+
+
+def select_context(frame: dict, max_context_lines: int | None) -> list:
+    """Picks at most `max_context_lines` context lines centred on the frame's line"""
+    context = frame.get("context") or []
+    if max_context_lines is None or len(context) <= max_context_lines:
+        return context
+
+    lineno = frame.get("lineNo")
+    center = next((i for i, ctx_line in enumerate(context) if ctx_line[0] == lineno), len(context) // 2)
+    start = min(max(center - max_context_lines // 2, 0), len(context) - max_context_lines)
+    return context[start:start + max_context_lines]
+
+
+def iter_stacktrace(
+    latest_event: dict,
+    max_frames: int | None = MAX_FRAMES,
+    max_context_lines: int | None = MAX_CONTEXT_LINES,
+) -> Iterator[str]:
+    """
+    Yields a formatted stacktrace for the latest Sentry event piece by piece.
+
+    Each exception, frame and context line is yielded as it is formatted, so
+    callers can stop early and the total work stays linear in the output size.
+    At most `max_frames` frames are rendered per exception (see select_frames)
+    and `max_context_lines` context lines per frame; None means no limit.
+    """
+    first = True
+    for entry in latest_event.get("entries", []):
+        if entry["type"] != "exception":
+            continue
+
+        exception_data = entry["data"]["values"]
+        for exception in exception_data:
+            exception_type = exception.get("type", "Unknown")
+            exception_value = exception.get("value", "")
+            stacktrace = exception.get("stacktrace")
+
+            if not first:
+                yield "\n"
+            first = False
+            yield f"Exception: {exception_type}: {exception_value}\n\n"
+            if not stacktrace:
+                continue
+
+            yield "Stacktrace:\n"
+            frames = stacktrace.get("frames") or []
+            previous = -1
+            for i in select_frames(frames, max_frames):
+                if i > previous + 1:
+                    yield f"... {i - previous - 1} frames omitted ...\n\n"
+                previous = i
+
+                frame = frames[i]
+                filename = frame.get("filename", "Unknown")
+                lineno = frame.get("lineNo", "?")
+                function = frame.get("function", "Unknown")
+                yield f"{filename}:{lineno} in {function}\n"
+
+                for ctx_line in select_context(frame, max_context_lines):
+                    yield f"    {ctx_line[1]}\n"
+
+                yield "\n"
+            if previous < len(frames) - 1:
+                yield f"... {len(frames) - previous - 1} frames omitted ...\n\n"
+
+
+def create_stacktrace(
+    latest_event: dict,
+    max_frames: int | None = MAX_FRAMES,
+    max_context_lines: int | None = MAX_CONTEXT_LINES,
+    max_chars: int | None = MAX_STACKTRACE_CHARS,
+) -> str:
     """
     Creates a formatted stacktrace string from the latest Sentry event.
 
@@ -99,98 +225,312 @@ def create_stacktrace(latest_event: dict) -> str:
     It handles multiple exceptions and includes file, line number, and function
     information for each frame in the stacktrace.
 
+    Output is bounded: see iter_stacktrace for the frame and context limits, and
+    rendering stops once `max_chars` characters, including the truncation
+    marker, have been produced.
+
     Args:
         latest_event (dict): A dictionary containing the latest Sentry event data.
+        max_frames (int | None): Frames rendered per exception, preferring in-app frames.
+        max_context_lines (int | None): Source context lines rendered per frame.
+        max_chars (int | None): Maximum length of the returned string, marker included.
 
     Returns:
         str: A formatted string containing the stacktrace information,
              or "No stacktrace found" if no relevant data is present.
     """
-    stacktraces = []
-    for entry in latest_event.get("entries", []):
-        if entry["type"] != "exception":
-            continue
+    parts = []
+    length = 0
+    for part in iter_stacktrace(latest_event, max_frames, max_context_lines):
+        if max_chars is not None and length + len(part) > max_chars:
+            # The marker counts towards max_chars
+            text = "".join(parts) + part
+            return text[:max(max_chars - len(STACKTRACE_TRUNCATED), 0)] + STACKTRACE_TRUNCATED
+        parts.append(part)
+        length += len(part)
 
-        exception_data = entry["data"]["values"]
-        for exception in exception_data:
-            exception_type = exception.get("type", "Unknown")
-            exception_value = exception.get("value", "")
-            stacktrace = exception.get("stacktrace")
+    return "".join(parts) if parts else "No stacktrace found"
+
+
+def create_http_client(auth_token: str, api_base: str = SENTRY_API_BASE) -> httpx.AsyncClient:
+    """
+    Creates the HTTP client shared by every Sentry request.
+
+    The auth header is set once as a default, and connections are pooled and
+    kept alive so repeated and concurrent requests skip the TCP/TLS handshake.
+    """
+    return httpx.AsyncClient(
+        base_url=api_base,
+        headers={"Authorization": f"Bearer {auth_token}"},
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+    )
 
-            stacktrace_text = f"Exception: {exception_type}: {exception_value}\n\n"
-            if stacktrace:
-                stacktrace_text += "Stacktrace:\n"
-                for frame in stacktrace.get("frames", []):
-                    filename = frame.get("filename", "Unknown")
-                    lineno = frame.get("lineNo", "?")
-                    function = frame.get("function", "Unknown")
 
-                    stacktrace_text += f"{filename}:{lineno} in {function}\n"
+@dataclass
+class CachedIssue:
+    data: SentryIssueData
+    issue_etag: str | None
+    hashes_etag: str | None
+    fetched_at: float
+
 
-                    if "context" in frame:
-                        context = frame["context"]
-                        for ctx_line in context:
-                            stacktrace_text += f"    {ctx_line[1]}\n"
+class SentryIssueCache:
+    """
+    An LRU cache of SentryIssueData keyed by issue ID.
+
+    Entries younger than `ttl` seconds are served as-is. Older entries are kept
+    along with the ETags of the responses they were built from, so they can be
+    revalidated with conditional requests instead of downloaded again.
+    """
 
-                    stacktrace_text += "\n"
+    def __init__(self, ttl: float = ISSUE_CACHE_TTL, max_entries: int = ISSUE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedIssue] = OrderedDict()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
 
-            stacktraces.append(stacktrace_text)
+    def get(self, issue_id: str) -> CachedIssue | None:
+        entry = self._entries.get(issue_id)
+        if entry is not None:
+            self._entries.move_to_end(issue_id)
+        return entry
 
-    return "\n".join(stacktraces) if stacktraces else "No stacktrace found"
+    def is_fresh(self, entry: CachedIssue) -> bool:
+        return time.monotonic() - entry.fetched_at < self.ttl
+
+    def put(self, issue_id: str, entry: CachedIssue):
+        self._entries[issue_id] = entry
+        self._entries.move_to_end(issue_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
 
 
 async def handle_sentry_issue(
-    http_client: httpx.AsyncClient, auth_token: str, issue_id_or_url: str
+    http_client: httpx.AsyncClient, issue_id_or_url: str, cache: SentryIssueCache | None = None
 ) -> SentryIssueData:
     try:
         issue_id = extract_issue_id(issue_id_or_url)
 
-        response = await http_client.get(
-            f"issues/{issue_id}/", headers={"Authorization": f"Bearer {auth_token}"}
+        cached = cache.get(issue_id) if cache is not None else None
+        if cached is not None and cache.is_fresh(cached):
+            cache.hits += 1
+            return cached.data
+
+        issue_headers = {}
+        hashes_headers = {}
+        if cached is not None:
+            if cached.issue_etag:
+                issue_headers["If-None-Match"] = cached.issue_etag
+            if cached.hashes_etag:
+                hashes_headers["If-None-Match"] = cached.hashes_etag
+
+        # The issue and its hashes are independent, so fetch them concurrently
+        response, hashes_response = await asyncio.gather(
+            http_client.get(f"issues/{issue_id}/", headers=issue_headers),
+            http_client.get(f"issues/{issue_id}/hashes/", headers=hashes_headers),
         )
         if response.status_code == 401:
-            raise McpError(
+            raise SentryError(
                 "Error: Unauthorized. Please check your MCP_SENTRY_AUTH_TOKEN token."
             )
-        response.raise_for_status()
-        issue_data = response.json()
 
-        # Get issue hashes
-        hashes_response = await http_client.get(
-            f"issues/{issue_id}/hashes/",
-            headers={"Authorization": f"Bearer {auth_token}"},
+        # A 304 is only sent in reply to our If-None-Match, so `cached` is set
+        if response.status_code == 304:
+            issue = cached.data
+        else:
+            response.raise_for_status()
+            issue_data = response.json()
+            issue = SentryIssueData(
+                title=issue_data["title"],
+                issue_id=issue_id,
+                status=issue_data["status"],
+                level=issue_data["level"],
+                first_seen=issue_data["firstSeen"],
+                last_seen=issue_data["lastSeen"],
+                count=issue_data["count"],
+                stacktrace="",
+            )
+
+        if hashes_response.status_code == 304:
+            stacktrace = cached.data.stacktrace
+        else:
+            hashes_response.raise_for_status()
+            hashes = hashes_response.json()
+
+            if not hashes:
+                raise SentryError("No Sentry events found for this issue")
+
+            latest_event = hashes[0]["latestEvent"]
+            stacktrace = create_stacktrace(latest_event)
+
+        data = replace(issue, stacktrace=stacktrace)
+
+        if cache is not None:
+            if response.status_code == 304 and hashes_response.status_code == 304:
+                cache.revalidated += 1
+            else:
+                cache.misses += 1
+            cache.put(issue_id, CachedIssue(
+                data=data,
+                issue_etag=response.headers.get("ETag") or issue_headers.get("If-None-Match"),
+                hashes_etag=hashes_response.headers.get("ETag") or hashes_headers.get("If-None-Match"),
+                fetched_at=time.monotonic(),
+            ))
+
+        return data
+
+    except SentryError as e:
+        raise mcp_error(str(e))
+    except httpx.HTTPStatusError as e:
+        raise mcp_error(f"Error fetching Sentry issue: {str(e)}")
+    except Exception as e:
+        raise mcp_error(f"An error occurred: {str(e)}")
+
+
+async def handle_sentry_issues(
+    http_client: httpx.AsyncClient, issue_ids_or_urls: list[str], cache: SentryIssueCache | None = None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """
+    Fetches several Sentry issues in parallel, at most
+    MAX_CONCURRENT_ISSUE_FETCHES at a time.
+
+    Duplicate IDs are fetched once. An issue that cannot be fetched is reported
+    in its own result instead of failing the whole batch.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_ISSUE_FETCHES)
+
+    async def fetch(issue_id_or_url: str) -> types.TextContent:
+        async with semaphore:
+            try:
+                issue_data = await handle_sentry_issue(http_client, issue_id_or_url, cache)
+            except McpError as e:
+                return types.TextContent(
+                    type="text", text=f"Error fetching Sentry issue {issue_id_or_url}: {e.error.message}"
+                )
+        return issue_data.to_tool_result()[0]
+
+    unique = list(dict.fromkeys(issue_ids_or_urls))
+    return list(await asyncio.gather(*(fetch(issue_id_or_url) for issue_id_or_url in unique)))
+
+
+@dataclass
+class SentryIssueSummary:
+    issue_id: str
+    short_id: str
+    title: str
+    status: str
+    level: str
+    count: str
+    user_count: int
+    last_seen: str
+
+    @classmethod
+    def from_api(cls, issue: dict) -> "SentryIssueSummary":
+        return cls(
+            issue_id=issue["id"],
+            short_id=issue.get("shortId", ""),
+            title=issue["title"],
+            status=issue.get("status", ""),
+            level=issue.get("level", ""),
+            count=issue.get("count", "0"),
+            user_count=issue.get("userCount", 0),
+            last_seen=issue.get("lastSeen", ""),
         )
-        hashes_response.raise_for_status()
-        hashes = hashes_response.json()
-
-        if not hashes:
-            raise McpError("No Sentry events found for this issue")
-
-        latest_event = hashes[0]["latestEvent"]
-        stacktrace = create_stacktrace(latest_event)
-
-        return SentryIssueData(
-            title=issue_data["title"],
-            issue_id=issue_id,
-            status=issue_data["status"],
-            level=issue_data["level"],
-            first_seen=issue_data["firstSeen"],
-            last_seen=issue_data["lastSeen"],
-            count=issue_data["count"],
-            stacktrace=stacktrace
+
+    def to_text(self) -> str:
+        return (
+            f"{self.short_id} [{self.level}/{self.status}] {self.title} "
+            f"({self.count} events, {self.user_count} users, last seen {self.last_seen}, ID {self.issue_id})"
         )
 
+
+def validate_slug(value: str, name: str) -> str:
+    if not value or not re.fullmatch(r"[\w.-]+", value):
+        raise SentryError(f"Invalid {name}: {value!r}")
+    return value
+
+
+async def iter_issue_pages(
+    http_client: httpx.AsyncClient, path: str, params: dict, page_size: int
+) -> AsyncIterator[list[dict]]:
+    """
+    Yields pages of issues from a Sentry list endpoint.
+
+    Sentry paginates with a cursor in the `Link` header. The next page is only
+    requested when the caller asks for it, so a caller that stops iterating
+    stops the requests too.
+    """
+    params = {**params, "limit": page_size}
+    while True:
+        response = await http_client.get(path, params=params)
+        if response.status_code == 401:
+            raise SentryError(
+                "Error: Unauthorized. Please check your MCP_SENTRY_AUTH_TOKEN token."
+            )
+        response.raise_for_status()
+        yield response.json()
+
+        next_link = response.links.get("next", {})
+        if next_link.get("results") != "true" or not next_link.get("cursor"):
+            return
+        params = {**params, "cursor": next_link["cursor"]}
+
+
+async def handle_issue_list(
+    http_client: httpx.AsyncClient, path: str, params: dict, limit: int | None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """Collects compact summaries of up to `limit` issues from a list endpoint"""
+    try:
+        limit = min(max(int(limit or DEFAULT_ISSUE_LIST_LIMIT), 1), MAX_ISSUE_LIST_LIMIT)
+        summaries = []
+        async for page in iter_issue_pages(http_client, path, params, min(limit, MAX_ISSUES_PER_PAGE)):
+            summaries.extend(SentryIssueSummary.from_api(issue) for issue in page[:limit - len(summaries)])
+            if len(summaries) >= limit:
+                break
     except SentryError as e:
-        raise McpError(str(e))
+        raise mcp_error(str(e))
     except httpx.HTTPStatusError as e:
-        raise McpError(f"Error fetching Sentry issue: {str(e)}")
+        raise mcp_error(f"Error listing Sentry issues: {str(e)}")
     except Exception as e:
-        raise McpError(f"An error occurred: {str(e)}")
+        raise mcp_error(f"An error occurred: {str(e)}")
+
+    if not summaries:
+        return [types.TextContent(type="text", text="No Sentry issues found")]
+    text = f"Found {len(summaries)} Sentry issues:\n" + "\n".join(summary.to_text() for summary in summaries)
+    return [types.TextContent(type="text", text=text)]
+
 
+async def list_project_issues(
+    http_client: httpx.AsyncClient, organization_slug: str, project_slug: str, query: str | None, limit: int | None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    try:
+        path = f"projects/{validate_slug(organization_slug, 'organization_slug')}/{validate_slug(project_slug, 'project_slug')}/issues/"
+    except SentryError as e:
+        raise mcp_error(str(e))
+    return await handle_issue_list(http_client, path, {"query": query or "is:unresolved"}, limit)
+
+
+async def search_organization_issues(
+    http_client: httpx.AsyncClient, organization_slug: str, query: str, limit: int | None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    try:
+        path = f"organizations/{validate_slug(organization_slug, 'organization_slug')}/issues/"
+    except SentryError as e:
+        raise mcp_error(str(e))
+    return await handle_issue_list(http_client, path, {"query": query}, limit)
 
-async def serve(auth_token: str) -> Server:
+
+async def serve(auth_token: str, api_base: str = SENTRY_API_BASE) -> Server:
     server = Server("sentry")
-    http_client = httpx.AsyncClient(base_url=SENTRY_API_BASE)
+    http_client = create_http_client(auth_token, api_base)
+    issue_cache = SentryIssueCache()
 
     @server.list_prompts()
     async def handle_list_prompts() -> list[types.Prompt]:
@@ -216,7 +556,7 @@ async def serve(auth_token: str) -> Server:
             raise ValueError(f"Unknown prompt: {name}")
 
         issue_id_or_url = (arguments or {}).get("issue_id_or_url", "")
-        issue_data = await handle_sentry_issue(http_client, auth_token, issue_id_or_url)
+        issue_data = await handle_sentry_issue(http_client, issue_id_or_url, issue_cache)
         return issue_data.to_prompt_result()
 
     @server.list_tools()
@@ -240,6 +580,73 @@ async def serve(auth_token: str) -> Server:
                     },
                     "required": ["issue_id_or_url"]
                 }
+            ),
+            types.Tool(
+                name="get_sentry_issues",
+                description="""Retrieve several Sentry issues by ID or URL in one call. Use this tool instead of
+                calling get_sentry_issue repeatedly when you need to review a batch of issues,
+                e.g. during on-call triage. Issues are fetched in parallel.""",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "issue_ids_or_urls": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Sentry issue IDs or URLs to analyze"
+                        }
+                    },
+                    "required": ["issue_ids_or_urls"]
+                }
+            ),
+            types.Tool(
+                name="list_sentry_issues",
+                description="""List the issues of a Sentry project as one-line summaries, most recent first.
+                Use this tool to see what is broken right now, then get_sentry_issue for details.""",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "organization_slug": {
+                            "type": "string",
+                            "description": "Sentry organization slug"
+                        },
+                        "project_slug": {
+                            "type": "string",
+                            "description": "Sentry project slug"
+                        },
+                        "query": {
+                            "type": "string",
+                            "description": "Sentry search query, defaults to is:unresolved"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": f"Maximum number of issues to return (default {DEFAULT_ISSUE_LIST_LIMIT}, at most {MAX_ISSUE_LIST_LIMIT})"
+                        }
+                    },
+                    "required": ["organization_slug", "project_slug"]
+                }
+            ),
+            types.Tool(
+                name="search_sentry_issues",
+                description="""Search the issues of a whole Sentry organization with a Sentry search query,
+                e.g. "is:unresolved level:error TypeError". Returns one-line summaries.""",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "organization_slug": {
+                            "type": "string",
+                            "description": "Sentry organization slug"
+                        },
+                        "query": {
+                            "type": "string",
+                            "description": "Sentry search query"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": f"Maximum number of issues to return (default {DEFAULT_ISSUE_LIST_LIMIT}, at most {MAX_ISSUE_LIST_LIMIT})"
+                        }
+                    },
+                    "required": ["organization_slug", "query"]
+                }
             )
         ]
 
@@ -247,13 +654,45 @@ async def serve(auth_token: str) -> Server:
     async def handle_call_tool(
         name: str, arguments: dict | None
     ) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        if name == "list_sentry_issues":
+            if not arguments or "organization_slug" not in arguments or "project_slug" not in arguments:
+                raise ValueError("Missing organization_slug or project_slug argument")
+
+            return await list_project_issues(
+                http_client,
+                arguments["organization_slug"],
+                arguments["project_slug"],
+                arguments.get("query"),
+                arguments.get("limit"),
+            )
+
+        if name == "search_sentry_issues":
+            if not arguments or "organization_slug" not in arguments or "query" not in arguments:
+                raise ValueError("Missing organization_slug or query argument")
+
+            return await search_organization_issues(
+                http_client, arguments["organization_slug"], arguments["query"], arguments.get("limit")
+            )
+
+        if name == "get_sentry_issues":
+            issue_ids_or_urls = (arguments or {}).get("issue_ids_or_urls")
+            # A plain string would otherwise be fetched one character at a time
+            if (
+                not isinstance(issue_ids_or_urls, list)
+                or not issue_ids_or_urls
+                or not all(isinstance(issue_id_or_url, str) for issue_id_or_url in issue_ids_or_urls)
+            ):
+                raise ValueError("issue_ids_or_urls must be a non-empty list of strings")
+
+            return await handle_sentry_issues(http_client, issue_ids_or_urls, issue_cache)
+
         if name != "get_sentry_issue":
             raise ValueError(f"Unknown tool: {name}")
 
         if not arguments or "issue_id_or_url" not in arguments:
             raise ValueError("Missing issue_id_or_url argument")
 
-        issue_data = await handle_sentry_issue(http_client, auth_token, arguments["issue_id_or_url"])
+        issue_data = await handle_sentry_issue(http_client, arguments["issue_id_or_url"], issue_cache)
         return issue_data.to_tool_result()
 
     return server
@@ -265,21 +704,55 @@ async def serve(auth_token: str) -> Server:
     required=True,
     help="Sentry authentication token",
 )
-def main(auth_token: str):
+@click.option(
+    "--api-base",
+    envvar="SENTRY_API_BASE",
+    default=SENTRY_API_BASE,
+    help="Sentry API base URL, e.g. for a self-hosted or mock Sentry",
+)
+@click.option(
+    "--transport",
+    type=click.Choice(["stdio", "sse"]),
+    default="stdio",
+    help="Serve over stdio, or over HTTP/SSE so many clients can share one long-running server",
+)
+@click.option("--host", default="127.0.0.1", help="Host to bind for the SSE transport")
+@click.option("--port", default=8000, help="Port to bind for the SSE transport")
+def main(auth_token: str, api_base: str, transport: str, host: str, port: int):
+    def initialization_options(server: Server) -> InitializationOptions:
+        return InitializationOptions(
+            server_name="sentry",
+            server_version="0.4.1",
+            capabilities=server.get_capabilities(
+                notification_options=NotificationOptions(),
+                experimental_capabilities={},
+            ),
+        )
+
     async def _run():
         async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-            server = await serve(auth_token)
-            await server.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="sentry",
-                    server_version="0.4.1",
-                    capabilities=server.get_capabilities(
-                        notification_options=NotificationOptions(),
-                        experimental_capabilities={},
-                    ),
-                ),
-            )
-
-    asyncio.run(_run())
+            server = await serve(auth_token, api_base)
+            await server.run(read_stream, write_stream, initialization_options(server))
+
+    async def _run_sse():
+        from mcp.server.sse import SseServerTransport
+        from starlette.applications import Starlette
+        from starlette.routing import Mount, Route
+        import uvicorn
+
+        # One server, HTTP client and issue cache shared by every SSE session
+        server = await serve(auth_token, api_base)
+        sse = SseServerTransport("/messages/")
+
+        async def handle_sse(request):
+            async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, initialization_options(server))
+
+        app = Starlette(routes=[
+            Route("/sse", endpoint=handle_sse),
+            Mount("/messages/", app=sse.handle_post_message),
+        ])
+        # SSE streams stay open until clients disconnect, so bound the graceful shutdown
+        await uvicorn.Server(uvicorn.Config(app, host=host, port=port, timeout_graceful_shutdown=5)).serve()
+
+    asyncio.run(_run_sse() if transport == "sse" else _run())
@@ -0,0 +1,84 @@
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class MockSentry:
+    """A local Sentry API serving issues and their hashes from memory.
+
+    Each response carries the resource's ETag unless `etags` is off, and a
+    request whose If-None-Match matches it gets a 304. Every request is
+    recorded as (path, If-None-Match header, status).
+    """
+
+    def __init__(self):
+        self.issues: dict[str, dict] = {}
+        self.etags = True
+        self.requests: list[tuple[str, str | None, int]] = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.api_base = f"http://127.0.0.1:{self.server.server_address[1]}/api/0/"
+
+    def add_issue(self, issue_id: str, title: str = "ZeroDivisionError", count: str = "1"):
+        self.issues[issue_id] = {
+            "title": title,
+            "status": "unresolved",
+            "level": "error",
+            "firstSeen": "2026-01-01T00:00:00Z",
+            "lastSeen": "2026-01-02T00:00:00Z",
+            "count": count,
+        }
+
+    def body(self, path: str) -> dict | list | None:
+        parts = path.strip("/").split("/")
+        if len(parts) < 4 or parts[:3] != ["api", "0", "issues"] or parts[3] not in self.issues:
+            return None
+        if len(parts) == 4:
+            return self.issues[parts[3]]
+        if parts[4:] == ["hashes"]:
+            return [{"latestEvent": {"entries": []}}]
+        return None
+
+    def paths(self) -> list[str]:
+        return [path for path, _, _ in self.requests]
+
+    def _handler(self):
+        sentry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = sentry.body(self.path)
+                if body is None:
+                    status, payload, etag = 404, b"{}", None
+                else:
+                    payload = json.dumps(body).encode()
+                    etag = f'"{zlib.crc32(payload):x}"' if sentry.etags else None
+                    status = 304 if etag and self.headers.get("If-None-Match") == etag else 200
+                sentry.requests.append((self.path, self.headers.get("If-None-Match"), status))
+                self.send_response(status)
+                if etag:
+                    self.send_header("ETag", etag)
+                if status == 304:
+                    self.end_headers()
+                    return
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def mock_sentry():
+    sentry = MockSentry()
+    thread = threading.Thread(target=sentry.server.serve_forever, daemon=True)
+    thread.start()
+    yield sentry
+    sentry.server.shutdown()
+    sentry.server.server_close()
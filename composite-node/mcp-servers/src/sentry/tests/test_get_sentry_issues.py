@@ -0,0 +1,35 @@
+import asyncio
+
+import mcp.types as types
+import pytest
+
+from mcp_server_sentry.server import serve
+
+
+def call_tool(mock_sentry, name: str, arguments: dict) -> types.CallToolResult:
+    """Call a tool through the server's request handler, as a client would"""
+
+    async def run():
+        server = await serve("token", mock_sentry.api_base)
+        request = types.CallToolRequest(method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments))
+        return (await server.request_handlers[types.CallToolRequest](request)).root
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("issue_ids_or_urls", ["123", [], ["1", 2], None])
+def test_issue_ids_must_be_a_list_of_strings(mock_sentry, issue_ids_or_urls):
+    mock_sentry.add_issue("1")
+    result = call_tool(mock_sentry, "get_sentry_issues", {"issue_ids_or_urls": issue_ids_or_urls})
+
+    assert result.isError
+    assert "non-empty list of strings" in result.content[0].text
+    assert mock_sentry.requests == []
+
+
+def test_duplicate_issue_ids_are_fetched_once(mock_sentry):
+    mock_sentry.add_issue("1")
+    result = call_tool(mock_sentry, "get_sentry_issues", {"issue_ids_or_urls": ["1", "1"]})
+
+    assert not result.isError and len(result.content) == 1
+    assert sorted(mock_sentry.paths()) == ["/api/0/issues/1/", "/api/0/issues/1/hashes/"]
@@ -0,0 +1,66 @@
+import asyncio
+
+from mcp_server_sentry.server import SentryIssueCache, create_http_client, handle_sentry_issue
+
+
+def fetch(mock_sentry, cache: SentryIssueCache, *issue_ids: str) -> list:
+    """Fetch issues one after another over one client, as the server does"""
+
+    async def run():
+        async with create_http_client("token", mock_sentry.api_base) as http_client:
+            return [await handle_sentry_issue(http_client, issue_id, cache) for issue_id in issue_ids]
+
+    return asyncio.run(run())
+
+
+def test_fresh_entry_makes_no_request(mock_sentry):
+    mock_sentry.add_issue("1")
+    cache = SentryIssueCache(ttl=60)
+
+    first, second = fetch(mock_sentry, cache, "1", "1")
+
+    assert second == first
+    assert sorted(mock_sentry.paths()) == ["/api/0/issues/1/", "/api/0/issues/1/hashes/"]
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_stale_entry_is_revalidated_with_if_none_match(mock_sentry):
+    mock_sentry.add_issue("1")
+    cache = SentryIssueCache(ttl=0)
+
+    first, second = fetch(mock_sentry, cache, "1", "1")
+
+    assert second == first
+    revalidations = mock_sentry.requests[2:]
+    assert len(revalidations) == 2
+    assert all(etag is not None and status == 304 for _, etag, status in revalidations)
+    assert (cache.misses, cache.revalidated) == (1, 1)
+
+
+def test_stale_entry_without_etag_is_fetched_again(mock_sentry):
+    mock_sentry.etags = False
+    mock_sentry.add_issue("1", count="1")
+    cache = SentryIssueCache(ttl=0)
+
+    (first,) = fetch(mock_sentry, cache, "1")
+    mock_sentry.add_issue("1", count="2")
+    (second,) = fetch(mock_sentry, cache, "1")
+
+    assert (first.count, second.count) == ("1", "2")
+    assert [(etag, status) for _, etag, status in mock_sentry.requests] == [(None, 200)] * 4
+    assert (cache.misses, cache.revalidated) == (2, 0)
+
+
+def test_least_recently_used_issue_is_evicted(mock_sentry):
+    for issue_id in ("1", "2", "3"):
+        mock_sentry.add_issue(issue_id)
+    cache = SentryIssueCache(ttl=60, max_entries=2)
+
+    # Touching 1 leaves 2 as the least recently used when 3 is added
+    fetch(mock_sentry, cache, "1", "2", "1", "3")
+    assert cache.get("1") is not None and cache.get("3") is not None
+    assert cache.get("2") is None
+
+    requests = len(mock_sentry.requests)
+    fetch(mock_sentry, cache, "1", "2")
+    assert sorted(mock_sentry.paths()[requests:]) == ["/api/0/issues/2/", "/api/0/issues/2/hashes/"]
@@ -0,0 +1,43 @@
+from mcp_server_sentry.server import MAX_STACKTRACE_CHARS, STACKTRACE_TRUNCATED, create_stacktrace
+
+
+def exception_event(exception_count: int, frame_count: int, line_chars: int) -> dict:
+    """An event with `exception_count` chained exceptions of in-app frames with long context lines"""
+    def frame(i: int) -> dict:
+        return {
+            "filename": f"app/module_{i}.py",
+            "lineNo": 10,
+            "function": f"function_{i}",
+            "inApp": True,
+            "context": [[10 + offset, "x" * line_chars] for offset in range(-2, 3)],
+        }
+
+    values = [
+        {"type": "ValueError", "value": f"error {n}", "stacktrace": {"frames": [frame(i) for i in range(frame_count)]}}
+        for n in range(exception_count)
+    ]
+    return {"entries": [{"type": "exception", "data": {"values": values}}]}
+
+
+def test_large_event_is_truncated_within_the_cap():
+    # Well over the cap even with the default frame and context limits
+    event = exception_event(exception_count=20, frame_count=50, line_chars=500)
+
+    text = create_stacktrace(event)
+
+    assert text.endswith(STACKTRACE_TRUNCATED)
+    assert len(text) <= MAX_STACKTRACE_CHARS
+    assert text.startswith("Exception: ValueError: error 0\n")
+
+
+def test_small_event_is_not_truncated():
+    text = create_stacktrace(exception_event(exception_count=1, frame_count=3, line_chars=20))
+
+    assert STACKTRACE_TRUNCATED not in text
+    assert text.count("app/module_") == 3
+
+
+def test_explicit_cap():
+    text = create_stacktrace(exception_event(exception_count=1, frame_count=30, line_chars=100), max_chars=1000)
+
+    assert len(text) == 1000 and text.endswith(STACKTRACE_TRUNCATED)
@@ -1,48 +1,107 @@
 import asyncio
 import argparse
-from typing import Optional, Dict
+from typing import Callable, Optional, Dict, List
 from contextlib import AsyncExitStack
 
 from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
-from anthropic import Anthropic
 from dotenv import load_dotenv
 
+from agent import EventCallback, run_agent_loop
+from llm import get_anthropic_client
+from metrics import PHASE_DURATION, PHASE_TOTAL, timed
+from rate_limit import RateLimitedToolCaller, TokenBucket
+from single_flight import SingleFlight, SingleFlightToolCaller
+from tool_cache import CachingToolCaller, ToolResultCache
+from tool_catalog import ToolCatalog
+
 load_dotenv()  # load environment variables from .env
 
 class MCPClient:
-    def __init__(self, server_script_path: str, env_variable: Optional[str] = None, env_name: Optional[str] = None):
+    def __init__(
+        self,
+        server_script_path: Optional[str],
+        env_variable: Optional[str] = None,
+        env_name: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        command: Optional[str] = None,
+        args: Optional[List[str]] = None,
+        env: Optional[Dict[str, str]] = None,
+    ):
         # Initialize session and client objects
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
-        self.anthropic = Anthropic()
+        self.anthropic = get_anthropic_client()
+        self.tool_catalog = ToolCatalog()
         self.model = "claude-3-5-sonnet-20241022"
         self.max_tokens = 1000
+        self.max_iterations = 10
+        self.max_total_tokens = 50000
+        self.max_parallel_tools = None
+        # Optional system prompt, sent as a cacheable prefix with the tools
+        self.system_prompt: Optional[str] = None
         self.server_script_path = server_script_path
         self.env_variable = env_variable
         self.env_name = env_name or "AUTH_TOKEN"
+        # Sent with every request when server_script_path is a remote SSE endpoint
+        self.headers = headers
+        # For stdio servers: the executable to run instead of python/node,
+        # arguments after the script and extra environment variables
+        self.command = command
+        self.args = list(args or [])
+        self.env = dict(env or {})
+        # Set by ChildConnectionManager to serve idempotent tool calls from a cache
+        self.service_name: Optional[str] = None
+        self.tool_cache: Optional[ToolResultCache] = None
+        # Set by ChildConnectionManager to pace calls to the child's tools
+        self.tool_rate_limit: Optional[TokenBucket] = None
+        # Set by ChildConnectionManager to share identical in-flight calls to read-only tools
+        self.single_flight: Optional[SingleFlight] = None
+        self.read_only_tool: Callable[[str], bool] = lambda tool: False
+
+    @property
+    def is_remote(self) -> bool:
+        """Whether the server is reached over HTTP/SSE instead of spawned over stdio"""
+        return bool(self.server_script_path) and self.server_script_path.startswith(('http://', 'https://'))
 
     async def connect_to_server(self):
-        """Connect to an MCP server"""
-        server_script_path = self.server_script_path
+        """Connect to an MCP server
+
+        ``server_script_path`` is either a local ``.py``/``.js`` script, spawned
+        as a child process over stdio, or the ``http(s)://.../sse`` endpoint of
+        a running server, reached over the SSE transport without spawning
+        anything. The remote server is configured on its own host, so
+        ``env_variable`` is not sent to it.
+
+        ``command`` runs a stdio server with another executable (e.g. ``uvx``
+        or ``npx``), with or without a script; ``args`` follow the script and
+        ``env`` is added to the child's environment.
+        """
+        server_script_path = self.server_script_path or ""
         is_python = server_script_path.endswith('.py')
         is_js = server_script_path.endswith('.js')
-        if not (is_python or is_js):
-            raise ValueError("Server script must be a .py or .js file")
+        if not (is_python or is_js or self.is_remote or self.command):
+            raise ValueError("Server script must be a .py or .js file or an http(s) SSE URL")
             
-        command = "python" if is_python else "node"
+        command = self.command or ("python" if is_python else "node")
+        script_args = [server_script_path] if server_script_path else []
         
         # For JavaScript modules, pass the env_variable as an argument AFTER the script path
         # For Python modules, use environment variables
-        if is_js and self.env_variable:
-            print(f"Passing {self.env_name} as a command-line argument to: {server_script_path}")
-            args = [server_script_path, self.env_variable]
+        # Remote servers take neither
+        if self.is_remote:
+            args = []
             env_dict = None
+        elif is_js and self.env_variable:
+            print(f"Passing {self.env_name} as a command-line argument to: {server_script_path}")
+            args = script_args + [self.env_variable] + self.args
+            env_dict = dict(self.env) or None
         else:
-            args = [server_script_path]
-            env_dict = {self.env_name: self.env_variable} if self.env_variable else None
-            if env_dict:
-                print(f"Setting environment variable {self.env_name} for: {server_script_path}")
+            args = script_args + self.args
+            env_dict = {**self.env, self.env_name: self.env_variable} if self.env_variable else dict(self.env) or None
+            if self.env_variable:
+                print(f"Setting environment variable {self.env_name} for: {server_script_path or command}")
         
         # Clean up any existing resources before starting new ones
         if self.session:
@@ -56,23 +115,30 @@ class MCPClient:
         await self.exit_stack.aclose()
         self.exit_stack = AsyncExitStack()
             
-        server_params = StdioServerParameters(
-            command=command,
-            args=args,
-            env=env_dict
-        )
-        
         try:
             # Create new connections in the current task context
-            stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
-            self.stdio, self.write = stdio_transport
-            self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
+            if self.is_remote:
+                transport = sse_client(server_script_path, headers=self.headers)
+            else:
+                transport = stdio_client(StdioServerParameters(
+                    command=command,
+                    args=args,
+                    env=env_dict
+                ))
+            service = self.service_name or "child"
+            with timed("spawn", PHASE_DURATION, PHASE_TOTAL, phase="spawn", service=service):
+                self.stdio, self.write = await self.exit_stack.enter_async_context(transport)
+            self.session = await self.exit_stack.enter_async_context(
+                ClientSession(self.stdio, self.write, message_handler=self.tool_catalog.handle_message)
+            )
             
-            await self.session.initialize()
+            with timed("initialize", PHASE_DURATION, PHASE_TOTAL, phase="initialize", service=service):
+                await self.session.initialize()
             
-            # List available tools
-            response = await self.session.list_tools()
-            tools = response.tools
+            # List available tools, priming the catalog for this connection
+            self.tool_catalog.invalidate()
+            with timed("list_tools", PHASE_DURATION, PHASE_TOTAL, phase="list_tools", service=service):
+                tools = await self.tool_catalog.refresh(self.session)
             print("\nConnected to server with tools:", [tool.name for tool in tools])
         except Exception as e:
             print(f"Error connecting to server: {str(e)}")
@@ -80,8 +146,12 @@ class MCPClient:
             await self.cleanup()
             raise
 
-    async def process_query(self, query: str) -> str:
-        """Process a query using Claude and available tools"""
+    async def process_query(self, query: str, on_event: Optional[EventCallback] = None, stream_text: bool = False) -> str:
+        """Process a query using Claude and available tools
+
+        ``on_event`` gets tool start/finish events; the replies are only
+        streamed to it as text deltas when ``stream_text`` is set.
+        """
         messages = [
             {
                 "role": "user",
@@ -89,57 +159,32 @@ class MCPClient:
             }
         ]
 
-        response = await self.session.list_tools()
-        available_tools = [{ 
-            "name": tool.name,
-            "description": tool.description,
-            "input_schema": tool.inputSchema
-        } for tool in response.tools]
-
-        # Initial Claude API call
-        response = self.anthropic.messages.create(
+        available_tools = await self.tool_catalog.get_anthropic_tools(self.session)
+
+        tool_caller = self.session
+        if self.tool_rate_limit is not None:
+            tool_caller = RateLimitedToolCaller(tool_caller, self.tool_rate_limit)
+        if self.single_flight is not None and self.service_name:
+            tool_caller = SingleFlightToolCaller(tool_caller, self.single_flight, self.service_name, self.read_only_tool)
+        if self.tool_cache is not None and self.service_name:
+            tool_caller = CachingToolCaller(tool_caller, self.tool_cache, self.service_name)
+
+        return await run_agent_loop(
+            self.anthropic,
+            tool_caller,
+            messages,
+            available_tools,
             model=self.model,
             max_tokens=self.max_tokens,
-            messages=messages,
-            tools=available_tools
+            max_iterations=self.max_iterations,
+            max_total_tokens=self.max_total_tokens,
+            max_parallel_tools=self.max_parallel_tools,
+            on_event=on_event,
+            service=self.service_name or "child",
+            system=self.system_prompt,
+            stream_text=stream_text
         )
 
-        # Process response and handle tool calls
-        final_text = []
-
-        for content in response.content:
-            if content.type == 'text':
-                final_text.append(content.text)
-            elif content.type == 'tool_use':
-                tool_name = content.name
-                tool_args = content.input
-                
-                # Execute tool call
-                result = await self.session.call_tool(tool_name, tool_args)
-                final_text.append(f"[Calling tool {tool_name} with args {tool_args}]")
-
-                # Continue conversation with tool results
-                if hasattr(content, 'text') and content.text:
-                    messages.append({
-                      "role": "assistant",
-                      "content": content.text
-                    })
-                messages.append({
-                    "role": "user", 
-                    "content": result.content
-                })
-
-                # Get next response from Claude
-                response = self.anthropic.messages.create(
-                    model=self.model,
-                    max_tokens=self.max_tokens,
-                    messages=messages,
-                )
-
-                final_text.append(response.content[0].text)
-
-        return "\n".join(final_text)
-
     async def process_single_query(self, query: str) -> str:
         """Process a single query and return a direct response
         
@@ -176,7 +221,7 @@ class MCPClient:
 
 async def main():
     parser = argparse.ArgumentParser(description='MCP Client')
-    parser.add_argument('server_script', help='Path to the server script (.py or .js)')
+    parser.add_argument('server_script', help='Path to the server script (.py or .js) or URL of a remote SSE server')
     
     args = parser.parse_args()
     
@@ -0,0 +1,82 @@
+import asyncio
+import math
+import time
+from typing import Dict
+
+
+class AdmissionRejected(Exception):
+    """Raised when a query is turned away instead of being queued"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounds in-flight queries and the queue of queries waiting to start.
+
+    Up to ``max_in_flight`` queries run at once. Up to ``max_queue`` more wait
+    for a slot for at most ``queue_timeout`` seconds. Anything beyond that is
+    rejected immediately with 429, and a query that times out in the queue is
+    rejected with 503. Both carry a ``retry_after`` estimate based on recent
+    query durations, so callers back off before subprocesses, file descriptors
+    or provider rate limits run out.
+    """
+
+    def __init__(self, max_in_flight: int = 4, max_queue: int = 32, queue_timeout: float = 30.0):
+        if max_in_flight < 1 or max_queue < 0:
+            raise ValueError("max_in_flight must be >= 1 and max_queue >= 0")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._in_flight = 0
+        self._waiting = 0
+        self._avg_duration = 1.0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to be free for a new request"""
+        backlog = (self._waiting + 1) / self.max_in_flight
+        return max(1, math.ceil(self._avg_duration * backlog))
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the start time to pass to ``release``"""
+        if not self._slots.locked() and not self._waiting:
+            # A slot is free: take it without queueing
+            await self._slots.acquire()
+        else:
+            if self._waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise AdmissionRejected(429, "Too many queued queries", self.retry_after())
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise AdmissionRejected(503, "Timed out waiting for a free query slot", self.retry_after())
+            finally:
+                self._waiting -= 1
+        self._in_flight += 1
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, started_at: float):
+        """Free a slot and fold the query's duration into the estimate"""
+        self._in_flight -= 1
+        self._slots.release()
+        duration = time.monotonic() - started_at
+        self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
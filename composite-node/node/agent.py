@@ -0,0 +1,265 @@
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import mcp.types as types
+from mcp import ClientSession
+
+from metrics import LLM_DURATION, LLM_REQUESTS, LLM_TOKENS, TOOL_CALLS, TOOL_DURATION, call_tool_traced, timed
+from rate_limit import estimate_tokens, get_rate_limiter
+
+# Receives progress events such as text deltas and tool call start/finish
+EventCallback = Callable[[dict], Awaitable[None]]
+
+# MCP logger name child tools use to report progress to the composite client
+PROGRESS_LOGGER = "fusion.progress"
+
+# Mark the tools, system prompt and conversation so far as cacheable prefixes,
+# so each turn only pays full price for what is new since the last one
+prompt_cache_enabled = os.environ.get('ANTHROPIC_PROMPT_CACHE', '1') != '0'
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def with_cache_breakpoints(tools: List[dict], messages: List[dict], system: Optional[str] = None) -> dict:
+    """Request arguments with prompt cache breakpoints after the stable prefixes
+
+    Breakpoints go on the last tool (caching every tool definition), the
+    system prompt and the last block of the latest message, which lets the
+    next turn of the loop read the whole conversation so far from the cache.
+    ``tools`` and ``messages`` are copied where marked, not modified.
+    """
+    request: Dict[str, Any] = {"tools": tools, "messages": messages}
+    if system:
+        request["system"] = [{"type": "text", "text": system, **({"cache_control": CACHE_CONTROL} if prompt_cache_enabled else {})}]
+    if not prompt_cache_enabled:
+        return request
+    if tools:
+        request["tools"] = tools[:-1] + [{**tools[-1], "cache_control": CACHE_CONTROL}]
+    if messages:
+        last = messages[-1]
+        content = last["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        if content and isinstance(content[-1], dict):
+            request["messages"] = messages[:-1] + [{**last, "content": content[:-1] + [{**content[-1], "cache_control": CACHE_CONTROL}]}]
+    return request
+
+
+def to_tool_result_content(content: List[Any]) -> List[dict]:
+    """Convert MCP tool result content into Anthropic ``tool_result`` content blocks"""
+    blocks = []
+    for item in content:
+        if isinstance(item, types.TextContent):
+            blocks.append({"type": "text", "text": item.text})
+        elif isinstance(item, types.ImageContent):
+            blocks.append({
+                "type": "image",
+                "source": {"type": "base64", "media_type": item.mimeType, "data": item.data}
+            })
+        else:
+            blocks.append({"type": "text", "text": json.dumps(item.model_dump(mode="json"))})
+    return blocks
+
+
+async def call_tool_as_result(session: ClientSession, tool_use: Any, on_event: Optional[EventCallback] = None, service: str = "composite") -> dict:
+    """Run one ``tool_use`` block and return its ``tool_result`` block
+
+    Failures are reported back to the model as an error result rather than
+    raised, so one broken service does not abort its sibling calls. The call
+    is timed per ``service`` and tool.
+    """
+    if on_event:
+        await on_event({"type": "tool_start", "id": tool_use.id, "name": tool_use.name, "input": tool_use.input})
+    try:
+        with timed("tool", TOOL_DURATION, TOOL_CALLS, service=service, tool=tool_use.name) as outcome:
+            result = await session.call_tool(tool_use.name, tool_use.input)
+            if result.isError:
+                outcome["status"] = "error"
+        tool_result = {
+            "type": "tool_result",
+            "tool_use_id": tool_use.id,
+            "content": to_tool_result_content(result.content),
+            "is_error": bool(result.isError)
+        }
+    except Exception as e:
+        tool_result = {
+            "type": "tool_result",
+            "tool_use_id": tool_use.id,
+            "content": f"Error calling tool {tool_use.name}: {str(e)}",
+            "is_error": True
+        }
+    if on_event:
+        await on_event({"type": "tool_end", "id": tool_use.id, "name": tool_use.name, "is_error": tool_result["is_error"]})
+    return tool_result
+
+
+async def execute_tool_calls(
+    session: ClientSession,
+    tool_uses: List[Any],
+    max_concurrency: Optional[int] = None,
+    on_event: Optional[EventCallback] = None,
+    service: str = "composite",
+) -> List[dict]:
+    """Run the ``tool_use`` blocks of one model turn concurrently
+
+    Returns the ``tool_result`` blocks in the same order as ``tool_uses``. At most
+    ``max_concurrency`` calls are in flight at once when it is set. ``session``
+    may be any object with a ``ClientSession``-compatible ``call_tool``.
+    """
+    if max_concurrency is None or max_concurrency >= len(tool_uses):
+        return list(await asyncio.gather(*[call_tool_as_result(session, tool_use, on_event, service) for tool_use in tool_uses]))
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def bounded(tool_use):
+        async with semaphore:
+            return await call_tool_as_result(session, tool_use, on_event, service)
+
+    return list(await asyncio.gather(*[bounded(tool_use) for tool_use in tool_uses]))
+
+
+async def create_message(anthropic: Any, on_event: Optional[EventCallback] = None, service: str = "composite", **kwargs) -> Any:
+    """Call ``messages.create``, or stream the reply when ``on_event`` is set
+
+    When streaming, each text delta is passed to ``on_event`` as it arrives and
+    the assembled final message is returned, so callers see the same result
+    either way.
+
+    Calls go through the process-wide rate limiter, which paces them within the
+    model's request and token budgets and retries rate limits and overloads. A
+    streamed reply is only retried if none of it has been emitted yet. Latency
+    and tokens are recorded per model and ``service``.
+    """
+    model = kwargs["model"]
+    with timed("llm", LLM_DURATION, LLM_REQUESTS, model=model, service=service):
+        response = await _create_message(anthropic, on_event, **kwargs)
+    LLM_TOKENS.inc(response.usage.input_tokens, model=model, service=service, direction="input")
+    LLM_TOKENS.inc(response.usage.output_tokens, model=model, service=service, direction="output")
+    # Prompt cache writes and reads, billed apart from (and not counted in) input tokens
+    LLM_TOKENS.inc(response.usage.cache_creation_input_tokens or 0, model=model, service=service, direction="cache_write")
+    LLM_TOKENS.inc(response.usage.cache_read_input_tokens or 0, model=model, service=service, direction="cache_read")
+    return response
+
+
+async def _create_message(anthropic: Any, on_event: Optional[EventCallback] = None, **kwargs) -> Any:
+    limiter = get_rate_limiter()
+    estimated_tokens = estimate_tokens(**kwargs)
+
+    if on_event is None:
+        return await limiter.call(kwargs["model"], estimated_tokens, lambda: anthropic.messages.create(**kwargs))
+
+    emitted = False
+
+    async def stream_message():
+        nonlocal emitted
+        async with anthropic.messages.stream(**kwargs) as stream:
+            async for event in stream:
+                if event.type == "text":
+                    emitted = True
+                    await on_event({"type": "text", "text": event.text})
+            return await stream.get_final_message()
+
+    return await limiter.call(kwargs["model"], estimated_tokens, stream_message, retryable=lambda: not emitted)
+
+
+async def run_agent_loop(
+    anthropic: Any,
+    session: ClientSession,
+    messages: List[dict],
+    tools: List[dict],
+    model: str,
+    max_tokens: int,
+    max_iterations: int = 10,
+    max_total_tokens: Optional[int] = None,
+    max_parallel_tools: Optional[int] = None,
+    on_event: Optional[EventCallback] = None,
+    service: str = "composite",
+    system: Optional[str] = None,
+    stream_text: bool = True,
+) -> str:
+    """Run Claude and the session's tools until the model stops asking for tools
+
+    Each turn's ``tool_use`` blocks are executed concurrently and answered with
+    paired ``tool_result`` blocks in the next user message, so the model can
+    chain tool calls across turns. The loop ends when the model finishes
+    without requesting tools, after ``max_iterations`` model calls, or once the
+    tokens spent (input, output and prompt cache reads and writes) exceed
+    ``max_total_tokens``. ``messages`` is
+    extended in place with the conversation. When ``on_event`` is given, tool
+    start/finish events are reported to it as they happen; with
+    ``stream_text`` the model's replies are also streamed and their text deltas
+    reported. Without it each reply is a plain ``messages.create`` call, which
+    the rate limiter can retry in full. LLM and tool calls are timed under
+    ``service``. The tools, the optional ``system`` prompt and the
+    conversation so far are marked for prompt caching (see
+    ``with_cache_breakpoints``).
+
+    Returns the text of every turn, with a marker line for each tool call.
+    """
+    final_text = []
+    tokens_used = 0
+
+    for iteration in range(max_iterations):
+        response = await create_message(
+            anthropic,
+            on_event if stream_text else None,
+            service,
+            model=model,
+            max_tokens=max_tokens,
+            **with_cache_breakpoints(tools, messages, system)
+        )
+        usage = response.usage
+        # Prompt cache reads and writes are billed apart from input tokens
+        tokens_used += (
+            usage.input_tokens
+            + usage.output_tokens
+            + (usage.cache_read_input_tokens or 0)
+            + (usage.cache_creation_input_tokens or 0)
+        )
+
+        tool_uses = []
+        for content in response.content:
+            if content.type == 'text':
+                final_text.append(content.text)
+            elif content.type == 'tool_use':
+                tool_uses.append(content)
+                final_text.append(f"[Calling tool {content.name} with args {content.input}]")
+
+        messages.append({
+            "role": "assistant",
+            "content": response.content
+        })
+
+        if not tool_uses:
+            break
+
+        if iteration + 1 >= max_iterations:
+            final_text.append(f"[Stopped after {max_iterations} model calls]")
+            break
+        if max_total_tokens is not None and tokens_used >= max_total_tokens:
+            final_text.append(f"[Stopped after spending {tokens_used} tokens]")
+            break
+
+        tool_results = await execute_tool_calls(session, tool_uses, max_parallel_tools, on_event, service)
+        messages.append({
+            "role": "user",
+            "content": tool_results
+        })
+
+    return "\n".join(final_text)
+
+
+class RecordingToolCaller:
+    """Wraps a tool caller and remembers the names of the tools called through it
+
+    Calls carry the current trace to the server when tracing is on.
+    """
+
+    def __init__(self, session: Any):
+        self.session = session
+        self.tool_names: List[str] = []
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None) -> Any:
+        self.tool_names.append(name)
+        return await call_tool_traced(self.session, name, arguments)
@@ -0,0 +1,263 @@
+"""End-to-end benchmark: ``composite_server.py --api`` with stub LLM and children.
+
+Starts ``stub_llm`` on loopback, writes a service registry of ``--services``
+stub children (``stub_child.py`` over stdio, each answering after
+``--child-latency`` seconds) and runs ``composite_server.py server.py --api``
+against them. Each stub model turn asks for ``--fan-out`` tools at once, so a
+query makes a composite tool call per service, a sub-agent turn and a child
+tool call in each, then answers. ``/api/query`` is then driven at each
+concurrency level and the script reports latency percentiles, throughput,
+errors, process spawns (from ``/metrics``) and the peak process count and RSS
+of the composite process tree. Nothing leaves the machine.
+
+Usage: python bench/end_to_end.py [--levels 1,4,16] [--requests 64] [--llm-latency 0.05]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from stub_llm import StubLLMServer, create_app
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+NODE_DIR = os.path.dirname(BENCH_DIR)
+
+
+def fan_out_reply(fan_out: int):
+    """Stub model: call the first ``fan_out`` tools on the first turn, then answer"""
+    def reply(body: dict) -> List[dict]:
+        tools = body.get("tools") or []
+        content = body["messages"][-1]["content"]
+        answered = isinstance(content, list) and any(block.get("type") == "tool_result" for block in content)
+        if not tools or answered:
+            return [{"type": "text", "text": "stub answer"}]
+        blocks = []
+        for index, tool in enumerate(tools[:fan_out]):
+            properties = tool["input_schema"].get("properties", {})
+            argument = "user_query" if "user_query" in properties else next(iter(properties), "text")
+            blocks.append({"type": "tool_use", "id": f"toolu_{index}", "name": tool["name"], "input": {argument: "ping"}})
+        return blocks
+    return reply
+
+
+def write_registry(path: str, services: int):
+    """A registry of stub children; the latency reaches them as their "credential" """
+    config = {"services": {
+        f"stub{index}": {
+            "script": os.path.join(BENCH_DIR, "stub_child.py"),
+            "credential_env": "STUB_CHILD_LATENCY",
+            "env_name": "STUB_CHILD_LATENCY",
+            "description": f"Stub service {index}",
+        }
+        for index in range(services)
+    }}
+    with open(path, "w") as f:
+        json.dump(config, f)
+
+
+def process_tree(root: int) -> List[int]:
+    """``root`` and all its descendants, read from /proc"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the ppid follows its closing paren
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [root]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+def rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class TreeSampler:
+    """Samples the process count and total RSS of a process tree in the background"""
+
+    def __init__(self, root: int, interval: float = 0.05):
+        self.root = root
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_processes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self):
+        tree = process_tree(self.root)
+        self.peak_processes = max(self.peak_processes, len(tree))
+        self.peak_rss = max(self.peak_rss, sum(rss_bytes(pid) for pid in tree))
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+        self.sample()
+
+
+async def count_spawns(client: httpx.AsyncClient) -> int:
+    """Processes started and SSE connections opened so far, per ``/metrics``"""
+    text = (await client.get("/metrics")).text
+    return sum(int(float(value)) for value in re.findall(r'^fusion_phase_duration_seconds_count\{phase="spawn"[^}]*\} (\S+)$', text, re.M))
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, total: int, root: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started_at = time.perf_counter()
+            response = await client.post("/api/query", json={"query": "ping"})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started_at)
+            else:
+                errors += 1
+
+    spawns_before = await count_spawns(client)
+    with TreeSampler(root) as sampler:
+        started_at = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(total)])
+        elapsed = time.perf_counter() - started_at
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        "throughput": len(latencies) / elapsed,
+        "spawns": await count_spawns(client) - spawns_before,
+        "peak_processes": sampler.peak_processes,
+        "peak_rss_mb": sampler.peak_rss / 2 ** 20,
+    }
+
+
+async def wait_until_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"composite_server.py exited with code {server.returncode}")
+        try:
+            if (await client.get("/metrics")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError("composite_server.py did not start")
+
+
+async def run(args, server: subprocess.Popen) -> List[dict]:
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout) as client:
+        await wait_until_ready(client, server)
+        with TreeSampler(server.pid) as sampler:
+            pass
+        print(f"Started: {sampler.peak_processes} processes, {sampler.peak_rss / 2 ** 20:.0f} MB RSS, {await count_spawns(client)} spawns")
+        if args.warmup:
+            await run_level(client, max(args.levels), args.warmup, server.pid)
+
+        results = []
+        print(f"{'concurrency':>11}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'queries/s':>9}  {'errors':>6}  {'spawns':>6}  {'procs':>5}  {'peak RSS MB':>11}")
+        for concurrency in args.levels:
+            result = await run_level(client, concurrency, args.requests, server.pid)
+            results.append(result)
+            print(
+                f"{concurrency:>11}  {result['p50_ms'] or 0:>8.1f}  {result['p95_ms'] or 0:>8.1f}  {result['p99_ms'] or 0:>8.1f}  "
+                f"{result['throughput']:>9.1f}  {result['errors']:>6}  {result['spawns']:>6}  {result['peak_processes']:>5}  {result['peak_rss_mb']:>11.0f}"
+            )
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end composite server benchmark')
+    parser.add_argument('--levels', default='1,4,16', help='Comma separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=64, help='Queries per concurrency level')
+    parser.add_argument('--warmup', type=int, default=16, help='Queries run first at the highest level and not reported')
+    parser.add_argument('--services', type=int, default=2, help='Stub child services')
+    parser.add_argument('--fan-out', type=int, default=2, help='Tools the stub model calls at once per turn')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='Stub LLM response delay in seconds')
+    parser.add_argument('--child-latency', type=float, default=0.05, help='Stub child tool delay in seconds')
+    parser.add_argument('--tool-mode', choices=['agent', 'flat'], default='agent')
+    parser.add_argument('--pool-max-size', type=int, default=8, help='Composite sessions (server.py processes) at most')
+    parser.add_argument('--port', type=int, default=8790, help='Port for the composite API server')
+    parser.add_argument('--llm-port', type=int, default=8791, help='Port for the stub LLM')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Seconds a query may take')
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--log', default=os.devnull, help='File for the composite server output')
+    args = parser.parse_args()
+    args.levels = [int(level) for level in args.levels.split(",")]
+
+    with tempfile.TemporaryDirectory() as workdir, StubLLMServer(create_app(args.llm_latency, fan_out_reply(args.fan_out)), args.llm_port) as stub:
+        registry = os.path.join(workdir, "services.json")
+        write_registry(registry, args.services)
+        env = {
+            **os.environ,
+            "ANTHROPIC_BASE_URL": stub.base_url,
+            "ANTHROPIC_API_KEY": "stub",
+            # Measure the composite path, not the rate limiter
+            "ANTHROPIC_RPM": "1000000",
+            "ANTHROPIC_TPM": "1000000000",
+            "STUB_CHILD_LATENCY": str(args.child_latency),
+            "COMPOSITE_TOOL_MODE": args.tool_mode,
+            "RESPONSE_CACHE_ENABLED": "0",
+            "TOOL_CACHE_ENABLED": "0",
+        }
+        with open(args.log, "w") as log:
+            server = subprocess.Popen(
+                [sys.executable, "composite_server.py", "server.py", "--api", "--port", str(args.port),
+                 "--services-config", registry, "--pool-max-size", str(args.pool_max_size),
+                 "--max-queue", str(max(args.levels) * 2)],
+                cwd=NODE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+            )
+            try:
+                results = asyncio.run(run(args, server))
+            finally:
+                server.terminate()
+                try:
+                    server.wait(10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Load test: query throughput versus concurrency against a stub LLM.
+
+Runs ``MCPClient.process_query`` at increasing concurrency levels with every
+LLM call served by ``stub_llm`` on loopback. Because the Anthropic client is
+async and shares a pooled HTTP client, throughput should grow roughly in
+proportion to concurrency until the connection limit is reached. A blocking
+client would keep it flat at about ``1 / latency`` queries per second.
+
+Usage: python bench/llm_concurrency.py [--latency 0.1] [--requests 64]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_llm import StubLLMServer, create_app
+
+
+class StubSession:
+    """Stands in for a ClientSession that exposes no tools"""
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[])
+
+
+async def run_level(concurrency: int, total: int) -> float:
+    from MCPClient import MCPClient
+
+    client = MCPClient("stub.py")
+    client.session = StubSession()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await client.process_query("ping")
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(total)])
+    return total / (time.perf_counter() - start)
+
+
+async def run(levels, total: int):
+    from llm import close_anthropic_client
+
+    try:
+        baseline = None
+        print(f"{'concurrency':>11}  {'queries/s':>10}  {'speedup':>8}")
+        for concurrency in levels:
+            throughput = await run_level(concurrency, total)
+            baseline = baseline or throughput
+            print(f"{concurrency:>11}  {throughput:>10.1f}  {throughput / baseline:>7.1f}x")
+    finally:
+        await close_anthropic_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LLM concurrency load test')
+    parser.add_argument('--latency', type=float, default=0.1, help='Stub LLM response delay in seconds')
+    parser.add_argument('--requests', type=int, default=64, help='Queries per concurrency level')
+    parser.add_argument('--levels', default='1,2,4,8,16,32', help='Comma separated concurrency levels')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the stub LLM')
+    args = parser.parse_args()
+
+    with StubLLMServer(create_app(args.latency), args.port) as stub:
+        os.environ["ANTHROPIC_BASE_URL"] = stub.base_url
+        os.environ.setdefault("ANTHROPIC_API_KEY", "stub")
+        # Measure concurrency, not the rate limiter
+        os.environ.setdefault("ANTHROPIC_RPM", "1000000")
+        os.environ.setdefault("ANTHROPIC_TPM", "1000000000")
+        levels = [int(level) for level in args.levels.split(",")]
+        asyncio.run(run(levels, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Load test: rate limiting and backoff against a stub LLM that returns 429s.
+
+Runs ``MCPClient.process_query`` concurrently while ``stub_llm`` answers every
+n-th request with a 429 and a ``retry-after`` header. Every query should still
+succeed, paced by the process-wide token buckets and retried with jittered
+exponential backoff, with the request rate backing off after each 429.
+
+Usage: python bench/llm_rate_limit.py [--rpm 600] [--throttle-every 5] [--requests 40]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_concurrency import StubSession
+from stub_llm import StubLLMServer, create_app
+
+
+async def run(total: int, concurrency: int):
+    from llm import close_anthropic_client
+    from MCPClient import MCPClient
+    from rate_limit import get_rate_limiter
+
+    client = MCPClient("stub.py")
+    client.session = StubSession()
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            try:
+                await client.process_query("ping")
+            except Exception as e:
+                failures += 1
+                print(f"Query failed: {e}")
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(total)])
+        elapsed = time.perf_counter() - start
+    finally:
+        await close_anthropic_client()
+
+    stats = get_rate_limiter().stats()
+    print(f"queries: {total}  failed: {failures}  elapsed: {elapsed:.1f}s  queries/min: {total / elapsed * 60:.0f}")
+    print(f"429s seen: {stats['throttled']}  retries: {stats['retries']}")
+    for model, rate in stats["request_rate_per_minute"].items():
+        print(f"{model}: request rate now {rate:.0f}/min")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rate limit and backoff load test')
+    parser.add_argument('--rpm', type=float, default=600, help='Requests per minute budget for the model')
+    parser.add_argument('--throttle-every', type=int, default=5, help='Answer every n-th request with a 429')
+    parser.add_argument('--retry-after', type=float, default=0.5, help='retry-after seconds sent with each 429')
+    parser.add_argument('--requests', type=int, default=40, help='Queries to run')
+    parser.add_argument('--concurrency', type=int, default=8, help='Queries in flight at once')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the stub LLM')
+    args = parser.parse_args()
+
+    app = create_app(latency=0.05, throttle_every=args.throttle_every, retry_after=args.retry_after)
+    with StubLLMServer(app, args.port) as stub:
+        os.environ["ANTHROPIC_BASE_URL"] = stub.base_url
+        os.environ.setdefault("ANTHROPIC_API_KEY", "stub")
+        os.environ["ANTHROPIC_RPM"] = str(args.rpm)
+        asyncio.run(run(args.requests, args.concurrency))
+        print(f"stub saw {app.state.requests} requests, throttled {app.state.throttled}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""A stand-in child MCP server for benchmarks and tests.
+
+Exposes one ``echo`` tool that answers after ``STUB_CHILD_LATENCY`` seconds
+(default 0.05), prefixed with ``STUB_CHILD_PREFIX`` (default ``echo``), so the
+composite path can be exercised offline. It speaks MCP over stdio, or over
+HTTP/SSE at ``/sse`` with ``--transport sse``.
+
+Usage: python bench/stub_child.py [--transport sse --host 127.0.0.1 --port 8000]
+"""
+import argparse
+import asyncio
+import os
+
+from fastmcp import FastMCP
+
+latency = float(os.environ.get("STUB_CHILD_LATENCY", "0.05"))
+prefix = os.environ.get("STUB_CHILD_PREFIX", "echo")
+
+mcp = FastMCP("Stub-Child")
+
+
+@mcp.tool()
+async def echo(text: str) -> str:
+    """Echo the text back after a fixed delay"""
+    await asyncio.sleep(latency)
+    return f"{prefix}: {text}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Stub child MCP server')
+    parser.add_argument('--transport', choices=['stdio', 'sse'], default='stdio')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind with --transport sse')
+    parser.add_argument('--port', type=int, default=8000, help='Port to bind with --transport sse')
+    args = parser.parse_args()
+    if args.transport == "sse":
+        asyncio.run(mcp.run_sse_async(host=args.host, port=args.port))
+    else:
+        mcp.run()
@@ -0,0 +1,117 @@
+"""A local stand-in for the Anthropic Messages API.
+
+Replies to ``POST /v1/messages`` after a fixed delay, so LLM-bound code paths
+can be exercised offline. Both plain and streaming (``"stream": true``)
+requests are supported. Point a client at it by setting
+``ANTHROPIC_BASE_URL=http://127.0.0.1:<port>``.
+"""
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+def text_reply(body: dict) -> List[dict]:
+    """Default reply: a single canned text block"""
+    return [{"type": "text", "text": "stub response"}]
+
+
+def build_message(body: dict, content: List[dict]) -> dict:
+    return {
+        "id": "msg_stub",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", "stub"),
+        "content": content,
+        "stop_reason": "tool_use" if any(block["type"] == "tool_use" for block in content) else "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 2},
+    }
+
+
+def stream_events(message: dict):
+    """Encode a message as the Messages API server-sent event sequence"""
+    def sse(event_type: str, data: dict) -> str:
+        return f"event: {event_type}\ndata: {json.dumps({'type': event_type, **data})}\n\n"
+
+    yield sse("message_start", {"message": {**message, "content": [], "stop_reason": None}})
+    for index, block in enumerate(message["content"]):
+        if block["type"] == "text":
+            yield sse("content_block_start", {"index": index, "content_block": {"type": "text", "text": ""}})
+            for word in block["text"].split(" "):
+                yield sse("content_block_delta", {"index": index, "delta": {"type": "text_delta", "text": word + " "}})
+        else:
+            yield sse("content_block_start", {"index": index, "content_block": {**block, "input": {}}})
+            yield sse("content_block_delta", {"index": index, "delta": {"type": "input_json_delta", "partial_json": json.dumps(block["input"])}})
+        yield sse("content_block_stop", {"index": index})
+    yield sse("message_delta", {"delta": {"stop_reason": message["stop_reason"], "stop_sequence": None}, "usage": {"output_tokens": message["usage"]["output_tokens"]}})
+    yield sse("message_stop", {})
+
+
+def create_app(
+    latency: float = 0.1,
+    reply: Optional[Callable[[dict], List[dict]]] = None,
+    throttle_every: int = 0,
+    retry_after: float = 1.0,
+) -> Starlette:
+    """Build the stub app
+
+    Every reply is delayed by ``latency`` seconds. ``reply`` maps the request
+    body to the content blocks to answer with, defaulting to ``text_reply``.
+    When ``throttle_every`` is set, every n-th request is answered with a 429
+    ``rate_limit_error`` carrying a ``retry-after`` header, as the real API
+    does when a rate limit is hit. ``app.state.requests`` and
+    ``app.state.throttled`` count what the stub has seen.
+    """
+    reply = reply or text_reply
+
+    async def messages(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        if throttle_every and app.state.requests % throttle_every == 0:
+            app.state.throttled += 1
+            return JSONResponse(
+                {"type": "error", "error": {"type": "rate_limit_error", "message": "stub rate limit"}},
+                status_code=429,
+                headers={"retry-after": str(retry_after)},
+            )
+        await asyncio.sleep(latency)
+        message = build_message(body, reply(body))
+        if body.get("stream"):
+            return StreamingResponse(stream_events(message), media_type="text/event-stream")
+        return JSONResponse(message)
+
+    app = Starlette(routes=[Route("/v1/messages", messages, methods=["POST"])])
+    app.state.requests = 0
+    app.state.throttled = 0
+    return app
+
+
+class StubLLMServer:
+    """Run a stub app on loopback in a background thread with its own event loop"""
+
+    def __init__(self, app: Starlette, port: int = 8765):
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
@@ -2,36 +2,108 @@ import asyncio
 import argparse
 import os
 import sys
-from typing import Optional
+from typing import Callable, Dict, List, Optional
 from contextlib import AsyncExitStack
-from fastapi import FastAPI, Depends, HTTPException
+import json
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 
+import anthropic
+import mcp.types as types
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
-from anthropic import Anthropic
 from dotenv import load_dotenv
 
+from admission import AdmissionController, AdmissionRejected
+from llm import get_anthropic_client, close_anthropic_client
+from metrics import PHASE_DURATION, PHASE_TOTAL, REGISTRY, timed, trace_context
+from rate_limit import get_rate_limiter, retry_after_seconds
+from agent import EventCallback, PROGRESS_LOGGER, RecordingToolCaller, run_agent_loop
+from conversations import Conversation, ConversationStore, add_query
+from response_cache import ResponseCache, is_complete_answer, load_embedder, near_match_threshold, services_for_tools
+from service_registry import SERVICES_CONFIG_ENV, ServiceRegistry, load_registry
+from session_pool import SessionPool
+from single_flight import SingleFlight, SingleFlightToolCaller
+from tool_catalog import ToolCatalog, catalog_stats
+
 load_dotenv()  # load environment variables from .env
-github_pat = os.environ.get('GITHUB_PAT')
-postgres_url = os.environ.get('POSTGRES_URL')
-redis_url = os.environ.get('REDIS_URL')
-sentry_auth_token = os.environ.get('SENTRY_AUTH_TOKEN')
+services_config = os.environ.get(SERVICES_CONFIG_ENV)
+tool_mode = os.environ.get('COMPOSITE_TOOL_MODE')
+single_flight_enabled = os.environ.get('FUSION_SINGLE_FLIGHT', '1') != '0'
+response_cache_enabled = os.environ.get('RESPONSE_CACHE_ENABLED', '0') == '1'
+response_cache_ttl = float(os.environ.get('RESPONSE_CACHE_TTL', '300'))
+response_cache_similarity = os.environ.get('RESPONSE_CACHE_SIMILARITY')
+response_cache_embedder = os.environ.get('RESPONSE_CACHE_EMBEDDER')
+pool_min_size = int(os.environ.get('COMPOSITE_POOL_MIN_SIZE', '1'))
+pool_max_size = int(os.environ.get('COMPOSITE_POOL_MAX_SIZE', '4'))
+max_in_flight = int(os.environ.get('COMPOSITE_MAX_IN_FLIGHT', '0')) or None
+max_queue = int(os.environ.get('COMPOSITE_MAX_QUEUE', '32'))
+queue_timeout = float(os.environ.get('COMPOSITE_QUEUE_TIMEOUT', '30'))
+conversation_ttl = float(os.environ.get('CONVERSATION_TTL', '1800'))
+conversation_max_sessions = int(os.environ.get('CONVERSATION_MAX_SESSIONS', '1000'))
+conversation_max_tokens = int(os.environ.get('CONVERSATION_MAX_TOKENS', '20000'))
+
+# Settings server.py reads from its environment, forwarded to it as-is
+FORWARDED_ENV_PREFIXES = ("CHILD_", "TOOL_CACHE_", "ANTHROPIC_", "FUSION_")
+
+def composite_environment(registry: ServiceRegistry, credentials: Dict[str, Optional[str]], tool_mode: Optional[str] = None, services_config: Optional[str] = None) -> Dict[str, str]:
+    """Environment for the ``server.py`` process
+
+    Holds the services' credentials, the registry file, the tool mode, any
+    ``<SERVICE>_MCP_URL`` overrides and the child pool, cache and LLM settings.
+    """
+    env = {name: value for name, value in credentials.items() if value}
+    for name, value in os.environ.items():
+        if name.startswith(FORWARDED_ENV_PREFIXES) or name in (f"{service.upper()}_MCP_URL" for service in registry.names):
+            env.setdefault(name, value)
+    if services_config:
+        env[SERVICES_CONFIG_ENV] = os.path.abspath(services_config)
+    if tool_mode:
+        env["COMPOSITE_TOOL_MODE"] = tool_mode
+    return env
+
+def credential_status(registry: ServiceRegistry, env: Dict[str, str]) -> str:
+    return ", ".join(f"{name}={'✓' if env.get(name) else '✗'}" for name in registry.credential_envs())
+
+def get_registry() -> ServiceRegistry:
+    """The service registry; composite tool names are prefixed with its service names"""
+    registry = getattr(app.state, "registry", None)
+    if registry is None:
+        registry = app.state.registry = load_registry(services_config)
+    return registry
 
 # Define request and response models
 class QueryRequest(BaseModel):
     query: str
+    # Continue the conversation with this id, as returned by an earlier query;
+    # without one a new conversation is started
+    session_id: Optional[str] = None
 
 class QueryResponse(BaseModel):
     response: str
+    session_id: Optional[str] = None
 
 # Create FastAPI app
 app = FastAPI(title="Composite API")
 
 @app.on_event("startup")
 async def startup_event():
+    app.state.conversations = ConversationStore(
+        ttl=conversation_ttl,
+        max_conversations=conversation_max_sessions,
+        max_history_tokens=conversation_max_tokens
+    )
+    if getattr(app.state, "response_cache_enabled", response_cache_enabled):
+        app.state.response_cache = ResponseCache(
+            ttl=response_cache_ttl,
+            similarity_threshold=near_match_threshold(response_cache_similarity, response_cache_embedder),
+            embed=load_embedder(response_cache_embedder) if response_cache_embedder else None,
+        )
+        print("Response cache enabled")
+
     # Verify the server script path is set
     if not hasattr(app.state, "server_script"):
         print("WARNING: server_script not set in app.state. API calls will fail.")
@@ -42,6 +114,41 @@ async def startup_event():
             sys.exit(1)
         print(f"Server script confirmed at {script_path}")
 
+        # Warm a pool of connected composite sessions so requests skip the
+        # subprocess spawn, initialize handshake and list_tools round trip
+        # One in-flight call to a read-only tool (such as a Sentry or Postgres
+        # sub-agent) is shared by every concurrent query making the same call
+        app.state.single_flight = SingleFlight() if single_flight_enabled else None
+
+        def create_server() -> CompositeServer:
+            server = CompositeServer(script_path, app.state.service_env)
+            server.single_flight = app.state.single_flight
+            server.read_only_tool = get_registry().is_read_only
+            return server
+
+        app.state.pool = SessionPool(
+            create_server,
+            min_size=getattr(app.state, "pool_min_size", pool_min_size),
+            max_size=getattr(app.state, "pool_max_size", pool_max_size),
+        )
+        await app.state.pool.start()
+        print(f"Session pool ready with {app.state.pool.size} connected session(s)")
+
+        # Queries beyond the pool size would only queue for a session, so by
+        # default admit as many queries as there are sessions
+        app.state.admission = AdmissionController(
+            max_in_flight=getattr(app.state, "max_in_flight", max_in_flight) or app.state.pool.max_size,
+            max_queue=getattr(app.state, "max_queue", max_queue),
+            queue_timeout=getattr(app.state, "queue_timeout", queue_timeout),
+        )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    pool = getattr(app.state, "pool", None)
+    if pool is not None:
+        await pool.close()
+    await close_anthropic_client()
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -52,18 +159,30 @@ app.add_middleware(
 )
 
 class CompositeServer:
-    def __init__(self, server_script_path: str, github_pat: Optional[str] = None, postgres_url: Optional[str] = None, redis_url: Optional[str] = None, sentry_auth_token: Optional[str] = None):
+    def __init__(self, server_script_path: str, env: Optional[Dict[str, str]] = None, max_parallel_tools: Optional[int] = 4):
         # Initialize session and client objects
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
-        self.anthropic = Anthropic()
+        self.anthropic = get_anthropic_client()
+        self.tool_catalog = ToolCatalog()
         self.model = "claude-3-5-sonnet-20241022"
         self.max_tokens = 1000
+        self.max_iterations = 10
+        self.max_total_tokens = 100000
+        self.max_parallel_tools = max_parallel_tools
+        # Optional system prompt, sent as a cacheable prefix with the tools
+        self.system_prompt: Optional[str] = None
+        # Set by the API server so identical concurrent calls to read-only
+        # tools share one call, across every pooled session
+        self.single_flight: Optional[SingleFlight] = None
+        self.read_only_tool: Callable[[str], bool] = lambda tool: False
+        self._on_event: Optional[EventCallback] = None
+        self.last_tools_used: list = []
+        # The last query's full message list, for continuing the conversation
+        self.last_messages: List[dict] = []
         self.server_script_path = server_script_path
-        self.github_pat = github_pat
-        self.postgres_url = postgres_url
-        self.redis_url = redis_url
-        self.sentry_auth_token = sentry_auth_token
+        # Credentials and settings for server.py, see composite_environment
+        self.env = env or {}
 
     async def connect_to_server(self):
         """Connect to an MCP server"""
@@ -76,15 +195,7 @@ class CompositeServer:
         command = "python" if is_python else "node"
         
         # Create a clean environment dictionary, filtering out None values
-        env_dict = {}
-        if self.github_pat:
-            env_dict["GITHUB_PAT"] = self.github_pat
-        if self.postgres_url:
-            env_dict["POSTGRES_URL"] = self.postgres_url
-        if self.redis_url:
-            env_dict["REDIS_URL"] = self.redis_url
-        if self.sentry_auth_token:
-            env_dict["SENTRY_AUTH_TOKEN"] = self.sentry_auth_token
+        env_dict = {name: value for name, value in self.env.items() if value}
             
         # Create server parameters with the environment dictionary
         server_params = StdioServerParameters(
@@ -107,15 +218,25 @@ class CompositeServer:
         
         try:
             # Create new connections in the current task context
-            stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
+            with timed("spawn", PHASE_DURATION, PHASE_TOTAL, phase="spawn", service="composite"):
+                stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
             self.stdio, self.write = stdio_transport
-            self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
+            self.session = await self.exit_stack.enter_async_context(
+                ClientSession(
+                    self.stdio,
+                    self.write,
+                    logging_callback=self._handle_log,
+                    message_handler=self.tool_catalog.handle_message
+                )
+            )
             
-            await self.session.initialize()
+            with timed("initialize", PHASE_DURATION, PHASE_TOTAL, phase="initialize", service="composite"):
+                await self.session.initialize()
             
-            # List available tools
-            response = await self.session.list_tools()
-            tools = response.tools
+            # List available tools, priming the catalog for this connection
+            self.tool_catalog.invalidate()
+            with timed("list_tools", PHASE_DURATION, PHASE_TOTAL, phase="list_tools", service="composite"):
+                tools = await self.tool_catalog.refresh(self.session)
             print("\nConnected to server with tools:", [tool.name for tool in tools])
         except Exception as e:
             print(f"Error connecting to server: {str(e)}")
@@ -123,65 +244,52 @@ class CompositeServer:
             await self.cleanup()
             raise
 
-    async def process_query(self, query: str) -> str:
-        """Process a query using Claude and available tools"""
-        messages = [
-            {
-                "role": "user",
-                "content": query
-            }
-        ]
-
-        response = await self.session.list_tools()
-        available_tools = [{ 
-            "name": tool.name,
-            "description": tool.description,
-            "input_schema": tool.inputSchema
-        } for tool in response.tools]
-
-        # Initial Claude API call
-        response = self.anthropic.messages.create(
-            model=self.model,
-            max_tokens=self.max_tokens,
-            messages=messages,
-            tools=available_tools
-        )
+    async def _handle_log(self, params: types.LoggingMessageNotificationParams):
+        """Forward progress reported by child tools to the running query"""
+        if self._on_event is None or params.logger != PROGRESS_LOGGER:
+            return
+        try:
+            event = json.loads(params.data) if isinstance(params.data, str) else dict(params.data)
+        except (TypeError, ValueError):
+            return
+        await self._on_event({**event, "type": "progress", "event": event.get("type")})
 
-        # Process response and handle tool calls
-        final_text = []
+    async def process_query(self, query: str, on_event: Optional[EventCallback] = None, history: Optional[List[dict]] = None) -> str:
+        """Process a query using Claude and available tools
 
-        for content in response.content:
-            if content.type == 'text':
-                final_text.append(content.text)
-            elif content.type == 'tool_use':
-                tool_name = content.name
-                tool_args = content.input
-                
-                # Execute tool call
-                result = await self.session.call_tool(tool_name, tool_args)
-                final_text.append(f"[Calling tool {tool_name} with args {tool_args}]")
-
-                # Continue conversation with tool results
-                if hasattr(content, 'text') and content.text:
-                    messages.append({
-                      "role": "assistant",
-                      "content": content.text
-                    })
-                messages.append({
-                    "role": "user", 
-                    "content": result.content
-                })
-
-                # Get next response from Claude
-                response = self.anthropic.messages.create(
-                    model=self.model,
-                    max_tokens=self.max_tokens,
-                    messages=messages,
-                )
+        When ``on_event`` is given, text deltas, tool start/finish events and
+        progress from child tools are reported to it while the query runs.
+        ``history`` holds earlier messages of the conversation to continue.
+        """
+        messages = add_query(list(history or []), query)
+        self.last_messages = messages
 
-                final_text.append(response.content[0].text)
+        available_tools = await self.tool_catalog.get_anthropic_tools(self.session)
 
-        return "\n".join(final_text)
+        tool_caller = self.session
+        if self.single_flight is not None:
+            tool_caller = SingleFlightToolCaller(tool_caller, self.single_flight, "composite", self.read_only_tool)
+        # Remember which tools answered the query, e.g. for cache invalidation
+        tool_caller = RecordingToolCaller(tool_caller)
+        self.last_tools_used = tool_caller.tool_names
+
+        self._on_event = on_event
+        try:
+            return await run_agent_loop(
+                self.anthropic,
+                tool_caller,
+                messages,
+                available_tools,
+                model=self.model,
+                max_tokens=self.max_tokens,
+                max_iterations=self.max_iterations,
+                max_total_tokens=self.max_total_tokens,
+                max_parallel_tools=self.max_parallel_tools,
+                on_event=on_event,
+                system=self.system_prompt
+            )
+        finally:
+            self._on_event = None
 
     async def process_single_query(self, query: str) -> str:
         """Process a single query and return a direct response
@@ -225,47 +333,112 @@ class CompositeServer:
 
 # Dependency to get CompositeServer instance
 async def get_composite_server(server_script_path: str = "server.py"):
+    registry = get_registry()
+    credentials = {name: os.environ.get(name) for name in registry.credential_envs()}
     server = CompositeServer(
-        server_script_path, 
-        github_pat, 
-        postgres_url, 
-        redis_url, 
-        sentry_auth_token
+        server_script_path,
+        composite_environment(registry, credentials, tool_mode, services_config)
     )
     await server.connect_to_server()
     return server
 
+def get_response_cache(http_request: Request) -> Optional[ResponseCache]:
+    """The response cache, unless disabled or bypassed by the request headers"""
+    cache = getattr(app.state, "response_cache", None)
+    if cache is None:
+        return None
+    if http_request.headers.get("x-fusion-cache", "").lower() == "bypass":
+        return None
+    if "no-cache" in http_request.headers.get("cache-control", "").lower():
+        return None
+    return cache
+
+async def admit_query() -> float:
+    """Reserve a query slot, turning the request away with 429/503 when overloaded"""
+    try:
+        return await app.state.admission.acquire()
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+def get_conversation(session_id: Optional[str]) -> Conversation:
+    """The conversation to continue, or a new one when no ``session_id`` is given
+
+    Session ids are generated by the server. An unknown or expired id is
+    rejected with 404 rather than starting a conversation under an id the
+    client picked.
+    """
+    conversations = app.state.conversations
+    if session_id is None:
+        return conversations.create()
+    conversation = conversations.get(session_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session_id: {session_id}")
+    return conversation
+
+def record_cached_answer(conversation: Conversation, query: str, answer: str):
+    """Add a query answered from the response cache to its conversation"""
+    messages = add_query(conversation.messages, query) + [{"role": "assistant", "content": answer}]
+    app.state.conversations.update(conversation, messages)
+
+async def run_pooled_query(pool: SessionPool, query: str, conversation: Conversation, on_event: Optional[EventCallback] = None) -> tuple:
+    """Run a query on a pooled session, continuing ``conversation``
+
+    Queries of one conversation run one at a time, preferably on the session
+    that served the previous one. The history is only updated when the query
+    succeeds. Returns the response text, the tools used and whether the answer
+    is complete enough to cache (see ``is_complete_answer``).
+    """
+    async with conversation.lock:
+        async with pool.session(prefer=conversation.server) as server:
+            response_text = await server.process_query(query, on_event=on_event, history=conversation.messages)
+            app.state.conversations.update(conversation, server.last_messages, server)
+            return response_text, list(server.last_tools_used), is_complete_answer(server.last_messages)
+
 # API endpoints
 @app.post("/api/query", response_model=QueryResponse)
-async def api_query(request: QueryRequest):
+async def api_query(request: QueryRequest, http_request: Request, response: Response):
     # Get server script path and environment variables from app state
     server_script = app.state.server_script
-    github_pat_val = app.state.github_pat
-    postgres_url_val = app.state.postgres_url
-    redis_url_val = app.state.redis_url
-    sentry_auth_token_val = app.state.sentry_auth_token
+    service_env = app.state.service_env
     
     print(f"DEBUG: Using server script: {server_script}")
-    print(f"DEBUG: Environment variables available: GITHUB_PAT={'✓' if github_pat_val else '✗'}, POSTGRES_URL={'✓' if postgres_url_val else '✗'}, REDIS_URL={'✓' if redis_url_val else '✗'}, SENTRY_AUTH_TOKEN={'✓' if sentry_auth_token_val else '✗'}")
+    print(f"DEBUG: Environment variables available: {credential_status(get_registry(), service_env)}")
     
-    # Create a fresh server instance for each request
-    server = CompositeServer(
-        server_script, 
-        github_pat_val, 
-        postgres_url_val, 
-        redis_url_val, 
-        sentry_auth_token_val
-    )
+    pool = getattr(app.state, "pool", None)
+    if pool is None:
+        raise HTTPException(status_code=503, detail="Composite session pool is not available")
     
+    # Follow-ups depend on the conversation's history, so only the first
+    # query of a conversation uses the response cache
+    conversation = get_conversation(request.session_id)
+    response_cache = get_response_cache(http_request) if not conversation.messages else None
+    if response_cache is not None:
+        cached = response_cache.get(request.query)
+        if cached is not None:
+            record_cached_answer(conversation, request.query, cached)
+            response.headers["X-Fusion-Cache"] = "hit"
+            return QueryResponse(response=cached, session_id=conversation.session_id)
+    response.headers["X-Fusion-Cache"] = "miss" if response_cache is not None else "bypass"
+    
+    started_at = await admit_query()
     response_text = ""
     error_occurred = False
     
     try:
-        print("DEBUG: Connecting to server...")
-        await server.connect_to_server()
-        print("DEBUG: Connected, processing query...")
-        response_text = await server.process_query(request.query)
+        # Check a warm, connected server out of the pool for this request
+        with trace_context(http_request.headers.get("traceparent")), timed("query", PHASE_DURATION, PHASE_TOTAL, phase="query", service="composite"):
+            response_text, tools_used, complete = await run_pooled_query(pool, request.query, conversation)
         print("DEBUG: Query processed successfully")
+        if response_cache is not None and complete:
+            response_cache.put(request.query, response_text, services_for_tools(tools_used, get_registry().names))
+    except anthropic.RateLimitError as e:
+        # Still rate limited after our own retries: pass the back-off on to the caller
+        retry_after = retry_after_seconds(e) or app.state.admission.retry_after()
+        raise HTTPException(status_code=429, detail="LLM rate limit exceeded", headers={"Retry-After": str(max(1, round(retry_after)))})
     except Exception as e:
         error_occurred = True
         print(f"DEBUG: Error in API endpoint: {str(e)}")
@@ -273,52 +446,179 @@ async def api_query(request: QueryRequest):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        # Always clean up in the same task context that created the resources
-        print("DEBUG: Cleaning up resources")
-        try:
-            await server.cleanup()
-        except Exception as cleanup_error:
-            print(f"DEBUG: Cleanup error: {str(cleanup_error)}")
+        app.state.admission.release(started_at)
     
     # Only return a response if no error occurred
     if not error_occurred:
-        return QueryResponse(response=response_text)
+        return QueryResponse(response=response_text, session_id=conversation.session_id)
+
+@app.post("/api/query/stream")
+async def api_query_stream(request: QueryRequest, http_request: Request):
+    """Stream a query's progress as Server-Sent Events
+
+    Emits ``text`` deltas, ``tool_start``/``tool_end`` and child ``progress``
+    events as they happen, then a final ``done`` event carrying the full
+    response and the conversation's ``session_id`` (or an ``error`` event).
+    A ``session_id`` continues that conversation as for ``/api/query``.
+    """
+    pool = getattr(app.state, "pool", None)
+    if pool is None:
+        raise HTTPException(status_code=503, detail="Composite session pool is not available")
+
+    events: asyncio.Queue = asyncio.Queue()
+    conversation = get_conversation(request.session_id)
+    response_cache = get_response_cache(http_request) if not conversation.messages else None
+    cached = response_cache.get(request.query) if response_cache is not None else None
+    if cached is not None:
+        record_cached_answer(conversation, request.query, cached)
+
+    # Admission is decided before streaming starts so overload is a plain 429/503
+    started_at = await admit_query() if cached is None else None
+
+    async def run_query():
+        try:
+            if cached is not None:
+                await events.put({"type": "done", "response": cached, "cached": True, "session_id": conversation.session_id})
+                return
+            # Acquire and release the pooled session inside this task
+            with trace_context(http_request.headers.get("traceparent")), timed("query", PHASE_DURATION, PHASE_TOTAL, phase="query", service="composite"):
+                response_text, tools_used, complete = await run_pooled_query(pool, request.query, conversation, on_event=events.put)
+            if response_cache is not None and complete:
+                response_cache.put(request.query, response_text, services_for_tools(tools_used, get_registry().names))
+            await events.put({"type": "done", "response": response_text, "session_id": conversation.session_id})
+        except Exception as e:
+            print(f"DEBUG: Error in streaming endpoint: {str(e)}")
+            await events.put({"type": "error", "detail": str(e)})
+        finally:
+            if started_at is not None:
+                app.state.admission.release(started_at)
+            await events.put(None)
+
+    # Start right away so the admission slot is released even if the client
+    # goes away before the stream is consumed
+    task = asyncio.create_task(run_query())
+
+    async def event_stream():
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            # Stop the query if the client disconnects mid-stream
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def read_metrics_snapshot(server: "CompositeServer") -> tuple:
+    """The metrics of one connected ``server.py`` process, labelled with its pid"""
+    result = await asyncio.wait_for(server.session.read_resource("metrics://snapshot"), 5.0)
+    snapshot = json.loads(result.contents[0].text)
+    return {"pid": str(snapshot["pid"])}, snapshot["metrics"]
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of the API server and of each connected ``server.py``
+
+    Phase, LLM and tool call latencies of sub-agents and child servers are
+    recorded in the ``server.py`` processes and labelled with their ``pid``.
+    """
+    remote = []
+    pool = getattr(app.state, "pool", None)
+    if pool is not None:
+        results = await asyncio.gather(*(read_metrics_snapshot(server) for server in pool.clients), return_exceptions=True)
+        remote = [result for result in results if not isinstance(result, BaseException)]
+    return Response(REGISTRY.render(remote), media_type="text/plain; version=0.0.4")
+
+@app.post("/api/cache/invalidate")
+async def api_cache_invalidate(service: Optional[str] = None):
+    """Drop cached responses, optionally only those that used one service"""
+    response_cache = getattr(app.state, "response_cache", None)
+    if response_cache is None:
+        return {"invalidated": 0}
+    return {"invalidated": response_cache.invalidate(service)}
+
+@app.delete("/api/sessions/{session_id}")
+async def api_delete_session(session_id: str):
+    """Forget a conversation's history"""
+    return {"deleted": app.state.conversations.delete(session_id)}
+
+@app.get("/api/stats")
+async def api_stats():
+    """Cache, admission, rate limit, single-flight and conversation counters for this API process"""
+    stats = {"tool_catalog": catalog_stats(), "rate_limit": get_rate_limiter().stats()}
+    admission = getattr(app.state, "admission", None)
+    if admission is not None:
+        stats["admission"] = admission.stats()
+    response_cache = getattr(app.state, "response_cache", None)
+    if response_cache is not None:
+        stats["response_cache"] = response_cache.stats()
+    single_flight = getattr(app.state, "single_flight", None)
+    if single_flight is not None:
+        stats["single_flight"] = single_flight.stats()
+    conversations = getattr(app.state, "conversations", None)
+    if conversations is not None:
+        stats["conversations"] = conversations.stats()
+    return stats
 
 async def main():
+    # The registry decides which credential flags exist, so read --services-config first
+    pre_parser = argparse.ArgumentParser(add_help=False)
+    pre_parser.add_argument('--services-config', default=services_config)
+    pre_args, _ = pre_parser.parse_known_args()
+    registry = load_registry(pre_args.services_config)
+
     parser = argparse.ArgumentParser(description='MCP Client')
     parser.add_argument('server_script', help='Path to the server script (.py or .js)')
-    parser.add_argument('--GITHUB_PAT', help='Environment variable to pass to the server script', default=None)
-    parser.add_argument('--POSTGRES_URL', help='Environment variable to pass to the server script', default=None)
-    parser.add_argument('--REDIS_URL', help='Environment variable to pass to the server script', default=None)
-    parser.add_argument('--SENTRY_AUTH_TOKEN', help='Environment variable to pass to the server script', default=None)
+    parser.add_argument('--services-config', default=services_config, help=f'JSON or YAML service registry (default: ${SERVICES_CONFIG_ENV} or the built-in services)')
+    for name in registry.credential_envs():
+        parser.add_argument(f'--{name}', help='Environment variable to pass to the server script', default=None)
+    parser.add_argument('--tool-mode', choices=['agent', 'flat'], default=tool_mode, help='agent: one sub-agent tool per service; flat: call child server tools directly')
     parser.add_argument('--api', action='store_true', help='Run as API server instead of chat loop')
+    parser.add_argument('--response-cache', action='store_true', default=response_cache_enabled, help='Cache /api/query responses for repeated queries')
     parser.add_argument('--port', type=int, default=8000, help='Port for API server')
+    parser.add_argument('--pool-min-size', type=int, default=pool_min_size, help='Connected composite sessions kept warm for the API server')
+    parser.add_argument('--pool-max-size', type=int, default=pool_max_size, help='Maximum composite sessions the API server may open at once. Each runs its own server.py, so CHILD_POOL_MAX_SIZE and the tool cache apply per session')
+    parser.add_argument('--max-in-flight', type=int, default=max_in_flight, help='Queries processed at once (defaults to --pool-max-size)')
+    parser.add_argument('--max-queue', type=int, default=max_queue, help='Queries allowed to wait for a slot before new ones get 429')
+    parser.add_argument('--queue-timeout', type=float, default=queue_timeout, help='Seconds a query may wait for a slot before it gets 503')
     args = parser.parse_args()
     
     # Use command line args if provided, otherwise use environment variables
-    github_pat_val = args.GITHUB_PAT if args.GITHUB_PAT is not None else github_pat
-    postgres_url_val = args.POSTGRES_URL if args.POSTGRES_URL is not None else postgres_url
-    redis_url_val = args.REDIS_URL if args.REDIS_URL is not None else redis_url
-    sentry_auth_token_val = args.SENTRY_AUTH_TOKEN if args.SENTRY_AUTH_TOKEN is not None else sentry_auth_token
+    credentials = {}
+    for name in registry.credential_envs():
+        value = getattr(args, name)
+        credentials[name] = value if value is not None else os.environ.get(name)
+    service_env = composite_environment(registry, credentials, args.tool_mode, args.services_config)
+    app.state.registry = registry
     
     if args.api:
         # Run as API server
         # Store the server script path and env vars in app state
         app.state.server_script = args.server_script
-        app.state.github_pat = github_pat_val
-        app.state.postgres_url = postgres_url_val
-        app.state.redis_url = redis_url_val
-        app.state.sentry_auth_token = sentry_auth_token_val
+        app.state.service_env = service_env
+        app.state.response_cache_enabled = args.response_cache
+        app.state.pool_min_size = args.pool_min_size
+        app.state.pool_max_size = args.pool_max_size
+        app.state.max_in_flight = args.max_in_flight
+        app.state.max_queue = args.max_queue
+        app.state.queue_timeout = args.queue_timeout
         
         print(f"Starting API server with server script: {args.server_script}")
-        print(f"Environment variables set: GITHUB_PAT={'✓' if github_pat_val else '✗'}, POSTGRES_URL={'✓' if postgres_url_val else '✗'}, REDIS_URL={'✓' if redis_url_val else '✗'}, SENTRY_AUTH_TOKEN={'✓' if sentry_auth_token_val else '✗'}")
+        print(f"Environment variables set: {credential_status(registry, service_env)}")
         
         config = uvicorn.Config(app, host="0.0.0.0", port=args.port)
         server = uvicorn.Server(config)
         await server.serve()
     else:
         # Run as traditional chat loop
-        client = CompositeServer(args.server_script, github_pat_val, postgres_url_val, redis_url_val, sentry_auth_token_val)
+        client = CompositeServer(args.server_script, service_env)
         try:
             await client.connect_to_server()
             await client.chat_loop()
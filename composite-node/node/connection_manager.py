@@ -0,0 +1,283 @@
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Callable, Dict, List, Optional, Set
+
+import mcp.types as types
+
+from MCPClient import MCPClient
+from metrics import PHASE_DURATION, PHASE_TOTAL, TOOL_CALLS, TOOL_DURATION, timed
+from rate_limit import TokenBucket
+from replica_set import ReplicaSet
+from session_pool import SessionPool
+from single_flight import COALESCED_CALLS, SingleFlight
+from tool_cache import ToolResultCache, canonical_arguments
+
+
+class ChildServerSpec:
+    """How to launch or reach one child MCP server
+
+    ``server_script_path`` is a local script to spawn over stdio, or the
+    ``http(s)://.../sse`` URL of a shared, long-running child server. A remote
+    child is reached over persistent SSE sessions that the pool reuses, so no
+    process is spawned on the composite node at all.
+
+    A local server is run with ``command`` when given (instead of python or
+    node, picked from the script's extension), followed by ``args``, with
+    ``env`` added to its environment.
+
+    ``replicas`` copies of the server are run (or connected to) and calls are
+    balanced across them. Pool sizes and timeouts left as None use the
+    connection manager's defaults, as does ``idle_timeout``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        server_script_path: Optional[str],
+        env_variable: Optional[str] = None,
+        env_name: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        replicas: int = 1,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        acquire_timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        command: Optional[str] = None,
+        args: Optional[List[str]] = None,
+        env: Optional[Dict[str, str]] = None,
+    ):
+        self.name = name
+        self.replicas = replicas
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.server_script_path = server_script_path
+        self.env_variable = env_variable
+        self.env_name = env_name
+        self.headers = headers
+        self.command = command
+        self.args = args
+        self.env = env
+
+    def create_client(self) -> MCPClient:
+        return MCPClient(self.server_script_path, self.env_variable, self.env_name, self.headers, self.command, self.args, self.env)
+
+
+class ChildConnectionManager:
+    """Keeps persistent ``MCPClient`` sessions to each child server.
+
+    A replica set per child server is created on first use and kept while
+    calls keep coming, so tool calls reuse a running child instead of
+    spawning, handshaking and tearing one down every time. Each replica has
+    its own pool; crashed children are detected when a session is checked out
+    or fails a health check and are restarted lazily by the pool.
+
+    A child server with no calls for ``idle_timeout`` seconds is shut down to
+    free its memory and started again on its next call (0 or None keeps it
+    running). ``prewarm`` starts latency-critical children up front and keeps
+    them running regardless of traffic.
+
+    Registering several specs under one name, or a spec with ``replicas`` > 1,
+    gives the server several replicas. Calls are balanced across them with
+    ``balancing`` (see ``ReplicaSet``), and a replica that fails
+    ``max_failures`` times in a row is ejected for ``ejection_time`` seconds.
+
+    ``max_size`` caps the concurrent calls to each replica; a call that
+    cannot get a session within ``acquire_timeout`` seconds fails instead of
+    queueing indefinitely, as does a child that does not finish its handshake
+    within ``connect_timeout`` seconds.
+
+    When ``tool_cache`` is set, results of idempotent child tool calls are
+    served from it, both for direct calls and inside sub-agent loops.
+
+    ``tool_rate_limits`` maps a child server name to the tool calls per minute
+    it may receive; calls beyond that wait for the server's token bucket.
+
+    When ``single_flight`` is set, identical concurrent calls to a tool that
+    ``read_only(server, tool)`` accepts share one call to the child.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 4,
+        health_check_interval: float = 30.0,
+        tool_cache: Optional[ToolResultCache] = None,
+        acquire_timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = 30.0,
+        tool_rate_limits: Optional[Dict[str, float]] = None,
+        balancing: str = "p2c",
+        max_failures: int = 3,
+        ejection_time: float = 30.0,
+        idle_timeout: Optional[float] = None,
+        single_flight: Optional[SingleFlight] = None,
+        read_only: Optional[Callable[[str, str], bool]] = None,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+        self.balancing = balancing
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.idle_timeout = idle_timeout
+        self.tool_cache = tool_cache
+        self.single_flight = single_flight
+        self.read_only = read_only or (lambda server, tool: False)
+        self._rate_limits: Dict[str, TokenBucket] = {
+            name: TokenBucket(capacity=max(rpm / 6, 1), rate=rpm / 60) for name, rpm in (tool_rate_limits or {}).items()
+        }
+        self._specs: Dict[str, List[ChildServerSpec]] = {}
+        self._replica_sets: Dict[str, ReplicaSet] = {}
+        self._pinned: Set[str] = set()
+        self._reaper: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def register(self, spec: ChildServerSpec):
+        """Make a child server, or another replica of it, available under ``spec.name``"""
+        self._specs.setdefault(spec.name, []).append(spec)
+
+    def _create_client(self, spec: ChildServerSpec) -> MCPClient:
+        client = spec.create_client()
+        client.service_name = spec.name
+        client.tool_cache = self.tool_cache
+        client.tool_rate_limit = self._rate_limits.get(spec.name)
+        client.single_flight = self.single_flight
+        client.read_only_tool = lambda tool: self.read_only(spec.name, tool)
+        return client
+
+    def _create_pool(self, spec: ChildServerSpec) -> SessionPool:
+        return SessionPool(
+            lambda: self._create_client(spec),
+            min_size=self.min_size if spec.min_size is None else spec.min_size,
+            max_size=self.max_size if spec.max_size is None else spec.max_size,
+            health_check_interval=self.health_check_interval,
+            acquire_timeout=self.acquire_timeout if spec.acquire_timeout is None else spec.acquire_timeout,
+            connect_timeout=self.connect_timeout if spec.connect_timeout is None else spec.connect_timeout,
+        )
+
+    def _idle_timeout(self, name: str) -> Optional[float]:
+        for spec in self._specs.get(name, []):
+            if spec.idle_timeout is not None:
+                return spec.idle_timeout
+        return self.idle_timeout
+
+    async def get_replica_set(self, name: str) -> ReplicaSet:
+        """Return the replica set for a child server, starting it on first use"""
+        replica_set = self._replica_sets.get(name)
+        if replica_set is not None:
+            return replica_set
+        async with self._lock:
+            replica_set = self._replica_sets.get(name)
+            if replica_set is None:
+                specs = self._specs.get(name)
+                if not specs:
+                    raise ValueError(f"Unknown child server: {name}")
+                pools = [self._create_pool(spec) for spec in specs for _ in range(spec.replicas)]
+                replica_set = ReplicaSet(name, pools, self.balancing, self.max_failures, self.ejection_time)
+                await replica_set.start()
+                self._replica_sets[name] = replica_set
+                if self._reaper is None and self._idle_timeout(name):
+                    self._reaper = asyncio.create_task(self._reap_loop())
+        return replica_set
+
+    async def prewarm(self, names: List[str]):
+        """Start the named child servers now and exempt them from idle reaping"""
+        self._pinned.update(names)
+        results = await asyncio.gather(*(self.get_replica_set(name) for name in names), return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                print(f"Warning: Could not prewarm child server {name}: {result}")
+
+    async def reap_idle(self) -> List[str]:
+        """Shut down the child servers that have been idle for their idle timeout"""
+        reaped = []
+        async with self._lock:
+            for name, replica_set in list(self._replica_sets.items()):
+                timeout = self._idle_timeout(name)
+                if name in self._pinned or not timeout or replica_set.idle_time() < timeout:
+                    continue
+                # A caller looks up a replica set and starts a call on it without
+                # yielding in between, so an idle set has no caller about to use it
+                del self._replica_sets[name]
+                reaped.append(replica_set)
+        for replica_set in reaped:
+            print(f"Stopping child server {replica_set.name} after {replica_set.idle_time():.0f}s idle")
+            await replica_set.close()
+        return [replica_set.name for replica_set in reaped]
+
+    async def _reap_loop(self):
+        while True:
+            timeouts = [self._idle_timeout(name) for name in self._replica_sets if name not in self._pinned]
+            timeouts = [timeout for timeout in timeouts if timeout]
+            if not timeouts:
+                # Nothing left to reap; get_replica_set restarts the loop when needed
+                self._reaper = None
+                return
+            await asyncio.sleep(min(min(timeouts) / 2, 30.0))
+            try:
+                await self.reap_idle()
+            except Exception as e:
+                print(f"Warning: Could not stop idle child servers: {e}")
+
+    @asynccontextmanager
+    async def session(self, name: str):
+        """Borrow a connected ``MCPClient`` for the named child server
+
+        The wait for a session, including starting the child, is timed as the
+        ``acquire`` phase.
+        """
+        async with AsyncExitStack() as stack:
+            with timed("acquire", PHASE_DURATION, PHASE_TOTAL, phase="acquire", service=name):
+                replica_set = await self.get_replica_set(name)
+                client = await stack.enter_async_context(replica_set.session())
+            yield client
+
+    async def call_tool(self, name: str, tool: str, arguments: Optional[dict] = None) -> types.CallToolResult:
+        """Call a tool on the named child server, using the result cache if enabled"""
+        with timed("tool", TOOL_DURATION, TOOL_CALLS, service=name, tool=tool) as outcome:
+            if self.single_flight is not None and self.read_only(name, tool):
+                key = (name, tool, canonical_arguments(arguments))
+                if self.single_flight.is_running(key):
+                    COALESCED_CALLS.inc(service=name, tool=tool)
+                result = await self.single_flight.do(key, lambda: self._call_tool(name, tool, arguments))
+            else:
+                result = await self._call_tool(name, tool, arguments)
+            if result.isError:
+                outcome["status"] = "error"
+        return result
+
+    async def _call_tool(self, name: str, tool: str, arguments: Optional[dict] = None) -> types.CallToolResult:
+        if self.tool_cache is not None:
+            result = self.tool_cache.get(name, tool, arguments)
+            if result is not None:
+                return result
+        bucket = self._rate_limits.get(name)
+        if bucket is not None:
+            await bucket.acquire()
+        async with self.session(name) as client:
+            result = await client.session.call_tool(tool, arguments)
+        if self.tool_cache is not None:
+            self.tool_cache.put(name, tool, arguments, result)
+        return result
+
+    def stats(self) -> Dict[str, List[dict]]:
+        """Load and health counters for each replica of each running child server"""
+        return {name: replica_set.stats() for name, replica_set in self._replica_sets.items()}
+
+    async def close(self):
+        """Shut down every child server"""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+        replica_sets, self._replica_sets = self._replica_sets, {}
+        for replica_set in replica_sets.values():
+            await replica_set.close()
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Stand-in for a tool call the agent loop stopped before running
+NOT_RUN = "Not run: the query stopped before this tool call was made"
+SUMMARY_HEADER = "Summary of the earlier part of this conversation:"
+
+
+def estimate_message_tokens(messages: List[dict]) -> int:
+    """Rough token count of a conversation: ~4 characters per token"""
+    return len(json.dumps(messages, default=str)) // 4
+
+
+def to_plain_blocks(content: Any) -> Any:
+    """Convert SDK content blocks (e.g. a model reply) to plain dicts"""
+    if isinstance(content, str):
+        return content
+    return [block.model_dump(exclude_none=True) if hasattr(block, "model_dump") else block for block in content]
+
+
+def blocks(message: dict) -> List[dict]:
+    content = message["content"]
+    return [{"type": "text", "text": content}] if isinstance(content, str) else content
+
+
+def is_query(message: dict) -> bool:
+    """Whether a message starts an exchange, i.e. is a user turn with a question in it"""
+    return message["role"] == "user" and any(block.get("type") == "text" for block in blocks(message))
+
+
+def close_tool_uses(messages: List[dict]) -> List[dict]:
+    """Pair any unanswered ``tool_use`` in the last reply with a not-run ``tool_result``
+
+    The agent loop can stop right after a reply that asks for tools (turn or
+    token limit). The API rejects a ``tool_use`` with no ``tool_result`` after
+    it, so the conversation could not be continued as is.
+    """
+    if not messages or messages[-1]["role"] != "assistant":
+        return messages
+    tool_uses = [block for block in blocks(messages[-1]) if block.get("type") == "tool_use"]
+    if not tool_uses:
+        return messages
+    return messages + [{
+        "role": "user",
+        "content": [{"type": "tool_result", "tool_use_id": block["id"], "content": NOT_RUN, "is_error": True} for block in tool_uses],
+    }]
+
+
+def add_query(messages: List[dict], query: str) -> List[dict]:
+    """Append a user question, joining a trailing user turn so roles keep alternating"""
+    if messages and messages[-1]["role"] == "user":
+        return messages[:-1] + [{"role": "user", "content": blocks(messages[-1]) + [{"type": "text", "text": query}]}]
+    return messages + [{"role": "user", "content": query}]
+
+
+class Conversation:
+    """The messages of one API session and the composite session that last served it"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.messages: List[dict] = []
+        self.server: Any = None
+        self.last_used = time.monotonic()
+        self.compactions = 0
+        # Queries of one conversation run one at a time, in order
+        self.lock = asyncio.Lock()
+
+
+class ConversationStore:
+    """Server-side state for ``/api/query`` sessions.
+
+    Conversations idle for ``ttl`` seconds expire, and the least recently used
+    are dropped beyond ``max_conversations``. Once a conversation's history
+    exceeds ``max_history_tokens`` it is compacted: tool results from earlier
+    exchanges are trimmed to ``tool_result_chars`` first, and if that is not
+    enough the oldest exchanges are replaced by a summary of their questions
+    and answers, ``summary_chars`` each and the latest ``summary_lines`` in
+    all. The latest exchange is kept, with its tool results trimmed only if it
+    is over budget on its own.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 1800.0,
+        max_conversations: int = 1000,
+        max_history_tokens: int = 20000,
+        tool_result_chars: int = 200,
+        summary_chars: int = 300,
+        summary_lines: int = 20,
+    ):
+        self.ttl = ttl
+        self.max_conversations = max_conversations
+        self.max_history_tokens = max_history_tokens
+        self.tool_result_chars = tool_result_chars
+        self.summary_chars = summary_chars
+        self.summary_lines = summary_lines
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.compactions = 0
+
+    def create(self) -> Conversation:
+        """Start a conversation under a new, server-generated session id"""
+        self._expire()
+        session_id = str(uuid.uuid4())
+        conversation = self._conversations[session_id] = Conversation(session_id)
+        self.created += 1
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+            self.evicted += 1
+        return conversation
+
+    def get(self, session_id: str) -> Optional[Conversation]:
+        """Return the session's conversation, or None if it is unknown or has expired"""
+        self._expire()
+        conversation = self._conversations.get(session_id)
+        if conversation is None:
+            return None
+        self._conversations.move_to_end(session_id)
+        conversation.last_used = time.monotonic()
+        return conversation
+
+    def delete(self, session_id: str) -> bool:
+        return self._conversations.pop(session_id, None) is not None
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._conversations:
+            conversation = next(iter(self._conversations.values()))
+            if now - conversation.last_used < self.ttl or conversation.lock.locked():
+                break
+            del self._conversations[conversation.session_id]
+            self.expired += 1
+
+    def update(self, conversation: Conversation, messages: List[dict], server: Any = None):
+        """Store a finished query's messages, compacting them if they are over budget"""
+        messages = close_tool_uses([{**message, "content": to_plain_blocks(message["content"])} for message in messages])
+        if estimate_message_tokens(messages) > self.max_history_tokens:
+            messages = self.compact(messages)
+            conversation.compactions += 1
+            self.compactions += 1
+        conversation.messages = messages
+        conversation.server = server
+        conversation.last_used = time.monotonic()
+
+    def compact(self, messages: List[dict]) -> List[dict]:
+        """Shrink a conversation to fit ``max_history_tokens`` where possible"""
+        starts = [index for index, message in enumerate(messages) if is_query(message)]
+        latest = starts[-1] if starts else 0
+
+        # Trim the tool results of earlier exchanges; the tool_use/tool_result
+        # pairs stay intact so the history remains valid
+        messages = [self._trim_tool_results(message) if index < latest else message for index, message in enumerate(messages)]
+
+        # Then fold the oldest exchanges into a summary until it fits
+        dropped: List[dict] = []
+        while len(starts) > 1 and estimate_message_tokens(messages) > self.max_history_tokens:
+            end = starts[1] - starts[0]
+            dropped.extend(messages[:end])
+            messages = messages[end:]
+            starts = [start - end for start in starts[1:]]
+        if dropped:
+            # The first kept turn may answer a tool_use that was just dropped
+            first = [block for block in blocks(messages[0]) if block.get("type") != "tool_result"]
+            summary = {"type": "text", "text": self._summarize(dropped)}
+            messages = [{"role": "user", "content": [summary] + first}] + messages[1:]
+
+        # A single exchange can be over budget by itself; trim its results last
+        if estimate_message_tokens(messages) > self.max_history_tokens:
+            messages = [self._trim_tool_results(message) for message in messages]
+        return messages
+
+    def _trim_tool_results(self, message: dict) -> dict:
+        if message["role"] != "user" or isinstance(message["content"], str):
+            return message
+        content = []
+        for block in message["content"]:
+            if block.get("type") == "tool_result":
+                text = block.get("content")
+                if not isinstance(text, str):
+                    text = "\n".join(item.get("text", "") for item in text or [] if item.get("type") == "text")
+                if len(text) > self.tool_result_chars:
+                    text = text[:self.tool_result_chars] + f" [trimmed {len(text) - self.tool_result_chars} characters]"
+                block = {**block, "content": text}
+            content.append(block)
+        return {**message, "content": content}
+
+    def _summarize(self, messages: List[dict]) -> str:
+        """The questions and answers of compacted exchanges, carrying over earlier summaries"""
+        lines = []
+        for message in messages:
+            texts = []
+            for block in blocks(message):
+                if block.get("type") != "text":
+                    continue
+                if block["text"].startswith(SUMMARY_HEADER):
+                    lines.extend(block["text"].splitlines()[1:])
+                else:
+                    texts.append(block["text"])
+            text = " ".join(texts).strip()
+            if not text:
+                continue
+            if len(text) > self.summary_chars:
+                text = text[:self.summary_chars] + "..."
+            lines.append(f"{'User' if message['role'] == 'user' else 'Assistant'}: {text}")
+        return "\n".join([SUMMARY_HEADER] + lines[-self.summary_lines:])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": len(self._conversations),
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "compactions": self.compactions,
+        }
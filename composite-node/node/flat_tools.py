@@ -0,0 +1,64 @@
+from typing import Any
+
+from fastmcp import FastMCP
+from fastmcp.tools.tool import Tool
+from fastmcp.utilities.func_metadata import func_metadata
+from mcp.types import TextContent
+from pydantic import PrivateAttr
+
+from connection_manager import ChildConnectionManager
+
+
+def _passthrough():
+    pass
+
+
+class ChildTool(Tool):
+    """A child server's tool re-exported as-is by the composite server
+
+    Calls go straight to the child over a pooled session with the caller's
+    structured arguments, skipping the nested sub-agent LLM loop.
+    """
+
+    service: str
+    _connections: ChildConnectionManager = PrivateAttr()
+
+    def __init__(self, connections: ChildConnectionManager, **kwargs):
+        super().__init__(**kwargs)
+        self._connections = connections
+
+    @classmethod
+    def from_child_tool(cls, connections: ChildConnectionManager, service: str, tool: Any) -> "ChildTool":
+        return cls(
+            connections,
+            service=service,
+            name=tool.name,
+            description=tool.description or "",
+            parameters=tool.inputSchema,
+            fn=_passthrough,
+            fn_metadata=func_metadata(_passthrough),
+            is_async=True,
+        )
+
+    async def run(self, arguments: dict[str, Any], context: Any = None) -> Any:
+        result = await self._connections.call_tool(self.service, self.name, arguments)
+        if result.isError:
+            message = result.content[0].text if result.content and isinstance(result.content[0], TextContent) else "Tool call failed"
+            raise ValueError(message)
+        return result.content
+
+
+async def build_flat_server(connections: ChildConnectionManager, service: str) -> FastMCP:
+    """Build a FastMCP server exposing the named child server's own tools
+
+    Mounting it under ``service`` makes each child tool callable as
+    ``<service>_<tool>`` (for example ``postgres_query``).
+    """
+    flat_mcp = FastMCP(f"{service}-flat")
+    async with connections.session(service) as client:
+        tools = await client.tool_catalog.get_tools(client.session)
+    for tool in tools:
+        # FastMCP 2.2 has no public API for registering a prebuilt Tool; this
+        # mirrors what FastMCP.import_server does internally
+        flat_mcp._tool_manager.add_tool(ChildTool.from_child_tool(connections, service, tool))
+    return flat_mcp
@@ -0,0 +1,46 @@
+import os
+from typing import Optional
+
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+from dotenv import load_dotenv
+
+load_dotenv()  # load environment variables from .env
+
+# Connection pool settings for the shared Anthropic client
+max_connections = int(os.environ.get('ANTHROPIC_MAX_CONNECTIONS', '100'))
+max_keepalive_connections = int(os.environ.get('ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS', '20'))
+keepalive_expiry = float(os.environ.get('ANTHROPIC_KEEPALIVE_EXPIRY', '30'))
+
+_client: Optional[AsyncAnthropic] = None
+
+
+def get_anthropic_client() -> AsyncAnthropic:
+    """Return the process-wide async Anthropic client
+
+    Every ``MCPClient`` and ``CompositeServer`` in the process shares one client,
+    so LLM calls never block the event loop and reuse pooled keep-alive
+    connections instead of opening a new one per instance. The SDK's own retries
+    are disabled; ``rate_limit`` applies one backoff policy to every call.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncAnthropic(
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=keepalive_expiry,
+                )
+            )
+        )
+    return _client
+
+
+async def close_anthropic_client():
+    """Close the shared client and its connection pool"""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.close()
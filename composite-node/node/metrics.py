@@ -0,0 +1,262 @@
+import contextvars
+import json
+import os
+import random
+import sys
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import mcp.types as types
+from dotenv import load_dotenv
+
+load_dotenv()  # load environment variables from .env
+
+# FUSION_TRACE=1 writes one JSON line per timed span to stderr and propagates
+# the trace into child sessions with a W3C traceparent
+tracing_enabled = os.environ.get('FUSION_TRACE', '0') == '1'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """A metric family: one series per combination of label values"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"series": [[list(key), value] for key, value in self._series.items()]}
+
+    def _render_series(self, labels: List[Tuple[str, str]], value: Any) -> List[str]:
+        raise NotImplementedError
+
+    def render(self, remote: Iterable[Tuple[Dict[str, str], Dict[str, Any]]] = ()) -> List[str]:
+        """Exposition lines for this family, plus series snapshotted in other processes
+
+        ``remote`` pairs the extra labels identifying a process with that
+        process's ``MetricsRegistry.snapshot()``.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for key, value in self._series.items():
+            lines.extend(self._render_series(list(zip(self.labelnames, key)), value))
+        for extra, snapshot in remote:
+            family = snapshot.get(self.name)
+            if family is None:
+                continue
+            for key, value in family["series"]:
+                lines.extend(self._render_series(list(zip(self.labelnames, key)) + list(extra.items()), value))
+        return lines
+
+
+class Counter(Metric):
+    """A monotonically increasing count"""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._series.get(self._key(labels), 0.0)
+
+    def _render_series(self, labels: List[Tuple[str, str]], value: Any) -> List[str]:
+        return [f"{self.name}{_format_labels(labels)} {value}"]
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative ``le`` buckets, with their sum and count"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # Per-bucket (non-cumulative) counts, the +Inf bucket last, then sum
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def _render_series(self, labels: List[Tuple[str, str]], value: Any) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), value[:-1]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {value[-1]}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metric families of one process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The current series of every family, for ``render`` in another process"""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self, remote: Iterable[Tuple[Dict[str, str], Dict[str, Any]]] = ()) -> str:
+        remote = list(remote)
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render(remote))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# "spawn" is starting a stdio child (or opening an SSE connection), followed by
+# the MCP "initialize" handshake and "list_tools"; "acquire" is waiting for a
+# pooled child session and "query" a whole API query
+PHASE_DURATION = REGISTRY.histogram("fusion_phase_duration_seconds", "Time spent in each phase of handling a query", ["phase", "service"])
+PHASE_TOTAL = REGISTRY.counter("fusion_phase_total", "Phases started, by outcome", ["phase", "service", "status"])
+LLM_DURATION = REGISTRY.histogram("fusion_llm_request_duration_seconds", "LLM call latency, including rate limit waits and retries", ["model", "service"])
+LLM_REQUESTS = REGISTRY.counter("fusion_llm_requests_total", "LLM calls, by outcome", ["model", "service", "status"])
+LLM_TOKENS = REGISTRY.counter("fusion_llm_tokens_total", "LLM tokens used", ["model", "service", "direction"])
+TOOL_DURATION = REGISTRY.histogram("fusion_tool_call_duration_seconds", "Tool call latency", ["service", "tool"])
+TOOL_CALLS = REGISTRY.counter("fusion_tool_calls_total", "Tool calls, by outcome", ["service", "tool", "status"])
+
+
+class SpanContext:
+    """The trace and span a piece of work belongs to"""
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @classmethod
+    def from_traceparent(cls, traceparent: Optional[str]) -> Optional["SpanContext"]:
+        parts = (traceparent or "").strip().split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        return cls(parts[1], parts[2])
+
+
+_current_span: contextvars.ContextVar[Optional[SpanContext]] = contextvars.ContextVar("fusion_span", default=None)
+
+
+def current_traceparent() -> Optional[str]:
+    """The traceparent of the innermost span, when tracing is on"""
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+
+@contextmanager
+def trace_context(traceparent: Optional[str] = None):
+    """Continue the trace in ``traceparent``, or start a new one, for the ``with`` block"""
+    if not tracing_enabled:
+        yield None
+        return
+    span = SpanContext.from_traceparent(traceparent) or SpanContext(f"{random.getrandbits(128):032x}", f"{random.getrandbits(64):016x}")
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def timed(name: str, histogram: Histogram, counter: Optional[Counter] = None, **labels: Any):
+    """Time the ``with`` block into ``histogram`` and count its outcome in ``counter``
+
+    The block fails if it raises or sets ``"status"`` in the yielded dict to
+    ``"error"``, e.g. for a tool result flagged as an error. With tracing on,
+    the block is also a span of the current trace, logged to stderr when it
+    ends.
+    """
+    parent = _current_span.get() if tracing_enabled else None
+    token = None
+    if parent is not None:
+        span = SpanContext(parent.trace_id, f"{random.getrandbits(64):016x}")
+        token = _current_span.set(span)
+    started_at = time.perf_counter()
+    outcome = {"status": "ok"}
+    try:
+        yield outcome
+    except BaseException:
+        outcome["status"] = "error"
+        raise
+    finally:
+        status = outcome["status"]
+        duration = time.perf_counter() - started_at
+        histogram.observe(duration, **labels)
+        if counter is not None:
+            counter.inc(status=status, **labels)
+        if token is not None:
+            _current_span.reset(token)
+            print(json.dumps({
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": parent.span_id,
+                "name": name,
+                "duration_ms": round(duration * 1000, 3),
+                "status": status,
+                "pid": os.getpid(),
+                **labels,
+            }), file=sys.stderr)
+
+
+async def call_tool_traced(session: Any, name: str, arguments: Optional[dict] = None) -> types.CallToolResult:
+    """``session.call_tool``, sending the current traceparent in the request's ``_meta``"""
+    traceparent = current_traceparent()
+    if traceparent is None or not hasattr(session, "send_request"):
+        return await session.call_tool(name, arguments)
+    return await session.send_request(
+        types.ClientRequest(
+            types.CallToolRequest(
+                method="tools/call",
+                params=types.CallToolRequestParams(name=name, arguments=arguments, _meta={"traceparent": traceparent}),
+            )
+        ),
+        types.CallToolResult,
+    )
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import anthropic
+from dotenv import load_dotenv
+
+load_dotenv()  # load environment variables from .env
+
+# Default per-model budgets, unlimited unless set; override per model with
+# ANTHROPIC_RATE_LIMITS, e.g. '{"claude-3-5-sonnet-20241022": {"rpm": 50, "tpm": 40000}}'
+default_rpm = float(os.environ['ANTHROPIC_RPM']) if os.environ.get('ANTHROPIC_RPM') else None
+default_tpm = float(os.environ['ANTHROPIC_TPM']) if os.environ.get('ANTHROPIC_TPM') else None
+max_retries = int(os.environ.get('ANTHROPIC_MAX_RETRIES', '5'))
+backoff_base = float(os.environ.get('ANTHROPIC_BACKOFF_BASE', '0.5'))
+backoff_cap = float(os.environ.get('ANTHROPIC_BACKOFF_CAP', '30'))
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at ``rate`` tokens per second"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until ``amount`` tokens are available and take them"""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+    def adjust(self, amount: float):
+        """Give back (positive) or take (negative) tokens after the fact"""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class ModelBudget:
+    """Requests-per-minute and tokens-per-minute budgets for one model.
+
+    A budget left as ``None`` is not enforced. The request rate adapts to the
+    provider: every 429 halves it (down to a tenth of the configured rate) and
+    each success restores a little of it, so several processes sharing one API
+    key settle below the real limit. Without a request budget only the 429's
+    ``retry-after`` is honoured.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(capacity=max(rpm / 6, 1), rate=rpm / 60) if rpm else None
+        self.tokens = TokenBucket(capacity=max(tpm / 6, 1), rate=tpm / 60) if tpm else None
+        self.blocked_until = 0.0
+
+    def throttled(self, retry_after: Optional[float]):
+        if self.requests is not None:
+            self.requests.rate = max(self.requests.rate / 2, self.rpm / 600)
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def succeeded(self):
+        if self.requests is not None:
+            self.requests.rate = min(self.requests.rate + self.rpm / 1200, self.rpm / 60)
+
+
+class RateLimiter:
+    """Process-wide rate limiter and retry policy for LLM calls"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        self.limits = limits or {}
+        self._budgets: Dict[str, ModelBudget] = {}
+        self.throttled = 0
+        self.retries = 0
+
+    def budget(self, model: str) -> ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            limits = self.limits.get(model, {})
+            budget = ModelBudget(limits.get("rpm", default_rpm), limits.get("tpm", default_tpm))
+            self._budgets[model] = budget
+        return budget
+
+    async def acquire(self, model: str, estimated_tokens: int):
+        """Wait until the model's request and token budgets allow another call"""
+        budget = self.budget(model)
+        delay = budget.blocked_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if budget.requests is not None:
+            await budget.requests.acquire()
+        if budget.tokens is not None:
+            await budget.tokens.acquire(estimated_tokens)
+
+    async def call(self, model: str, estimated_tokens: int, fn: Callable[[], Awaitable[Any]], retryable: Callable[[], bool] = lambda: True) -> Any:
+        """Run ``fn`` within the model's budgets, retrying rate limits and overloads
+
+        Retries use full-jitter exponential backoff, waiting at least as long as
+        the provider's ``retry-after`` header asks. ``retryable`` can veto a retry,
+        e.g. once a streamed reply has already been partly delivered.
+        """
+        budget = self.budget(model)
+        for attempt in range(max_retries + 1):
+            await self.acquire(model, estimated_tokens)
+            try:
+                response = await fn()
+            except (anthropic.RateLimitError, anthropic.InternalServerError, anthropic.APIConnectionError) as e:
+                retry_after = retry_after_seconds(e)
+                if isinstance(e, anthropic.RateLimitError):
+                    self.throttled += 1
+                    budget.throttled(retry_after)
+                if attempt >= max_retries or not retryable():
+                    raise
+                self.retries += 1
+                delay = random.uniform(0, min(backoff_cap, backoff_base * 2 ** attempt))
+                await asyncio.sleep(max(delay, retry_after or 0))
+                continue
+            budget.succeeded()
+            usage = getattr(response, "usage", None)
+            if usage is not None and budget.tokens is not None:
+                # Settle the token estimate against what the call really used,
+                # counting prompt cache reads and writes as input
+                used = usage.input_tokens + usage.output_tokens
+                used += (getattr(usage, "cache_creation_input_tokens", None) or 0) + (getattr(usage, "cache_read_input_tokens", None) or 0)
+                budget.tokens.adjust(estimated_tokens - used)
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "request_rate_per_minute": {model: budget.requests.rate * 60 for model, budget in self._budgets.items() if budget.requests is not None},
+        }
+
+
+class RateLimitedToolCaller:
+    """Wraps a ``ClientSession`` so ``call_tool`` waits for a token from ``bucket``
+
+    Child tool calls are not retried, since they are not all idempotent; they
+    are only paced so a sub-agent cannot exhaust a child's upstream API quota.
+    """
+
+    def __init__(self, session: Any, bucket: TokenBucket):
+        self.session = session
+        self.bucket = bucket
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None) -> Any:
+        await self.bucket.acquire()
+        return await self.session.call_tool(name, arguments)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the ``retry-after`` header from a provider error, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def estimate_tokens(max_tokens: int, **request: Any) -> int:
+    """Rough token estimate for a request: ~4 characters per input token"""
+    size = len(json.dumps(request.get("messages", []), default=str)) + len(json.dumps(request.get("tools", []), default=str))
+    return size // 4 + max_tokens
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter"""
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(json.loads(os.environ.get('ANTHROPIC_RATE_LIMITS', '{}')))
+    return _limiter
@@ -0,0 +1,157 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List
+
+from session_pool import SessionPool
+
+BALANCING_STRATEGIES = ("p2c", "least_outstanding")
+
+
+class Replica:
+    """One replica of a child server: its session pool plus load and health counters"""
+
+    def __init__(self, index: int, pool: SessionPool):
+        self.index = index
+        self.pool = pool
+        self.outstanding = 0
+        self.latency = 0.0
+        self.calls = 0
+        self.completed = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Whether the replica is not currently ejected"""
+        return time.monotonic() >= self.ejected_until
+
+    def load(self, default_latency: float) -> float:
+        """Expected wait for a new call: outstanding calls (plus this one) times latency
+
+        A replica with no calls yet is assumed to be as fast as ``default_latency``.
+        """
+        return (self.outstanding + 1) * (self.latency if self.completed else default_latency)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "outstanding": self.outstanding,
+            "calls": self.calls,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "ejected": not self.available,
+            "latency_ms": round(self.latency * 1000, 1),
+            "sessions": self.pool.size,
+        }
+
+
+class ReplicaSet:
+    """Spreads calls to one child server over several replicas.
+
+    Each replica has its own ``SessionPool``. A call goes to the least loaded
+    replica, either out of two picked at random (``"p2c"``, power of two
+    choices) or out of all of them (``"least_outstanding"``). Load is the
+    number of outstanding calls weighted by the replica's recent latency, so a
+    slow replica gets proportionally less work and a wedged one stops receiving
+    any as its outstanding calls pile up.
+
+    A replica whose sessions cannot be acquired, or whose session fails its
+    health check after a call raised, counts a failure. After ``max_failures``
+    consecutive failures it is ejected for ``ejection_time`` seconds, then gets
+    traffic again. If every replica is ejected, all of them are used rather
+    than failing outright.
+    """
+
+    def __init__(self, name: str, pools: List[SessionPool], strategy: str = "p2c", max_failures: int = 3, ejection_time: float = 30.0):
+        if not pools:
+            raise ValueError(f"Replica set {name} needs at least one replica")
+        if strategy not in BALANCING_STRATEGIES:
+            raise ValueError(f"Unknown balancing strategy: {strategy}")
+        self.name = name
+        self.replicas = [Replica(index, pool) for index, pool in enumerate(pools)]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.last_used = time.monotonic()
+
+    @property
+    def outstanding(self) -> int:
+        """Calls in progress across every replica"""
+        return sum(replica.outstanding for replica in self.replicas)
+
+    def idle_time(self) -> float:
+        """Seconds since the last call finished, or 0 while calls are in progress"""
+        return 0.0 if self.outstanding else time.monotonic() - self.last_used
+
+    async def start(self):
+        """Start every replica's pool; fails only if no replica could start"""
+        results = await asyncio.gather(*(replica.pool.start() for replica in self.replicas), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if len(errors) == len(self.replicas):
+            raise errors[0]
+        for replica, result in zip(self.replicas, results):
+            if isinstance(result, BaseException):
+                print(f"Warning: Replica {replica.index} of {self.name} failed to start: {result}")
+                self._failed(replica, eject=True)
+
+    def choose(self) -> Replica:
+        """Pick the replica for the next call"""
+        candidates = [replica for replica in self.replicas if replica.available] or self.replicas
+        if self.strategy == "p2c" and len(candidates) > 2:
+            candidates = random.sample(candidates, 2)
+        measured = [replica.latency for replica in self.replicas if replica.completed]
+        default_latency = sum(measured) / len(measured) if measured else 1.0
+        return min(candidates, key=lambda replica: replica.load(default_latency))
+
+    def _failed(self, replica: Replica, eject: bool = False):
+        replica.failures += 1
+        replica.consecutive_failures += 1
+        if eject or replica.consecutive_failures >= self.max_failures:
+            print(f"Warning: Ejecting replica {replica.index} of {self.name} for {self.ejection_time}s")
+            replica.ejections += 1
+            replica.consecutive_failures = 0
+            replica.ejected_until = time.monotonic() + self.ejection_time
+
+    def _succeeded(self, replica: Replica, duration: float):
+        replica.consecutive_failures = 0
+        replica.latency = duration if not replica.completed else 0.8 * replica.latency + 0.2 * duration
+        replica.completed += 1
+
+    @asynccontextmanager
+    async def session(self):
+        """Borrow a connected client from the least loaded replica"""
+        replica = self.choose()
+        replica.outstanding += 1
+        replica.calls += 1
+        started_at = time.monotonic()
+        try:
+            try:
+                pooled = await replica.pool.acquire()
+            except Exception:
+                self._failed(replica)
+                raise
+            failed = False
+            try:
+                yield pooled.client
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                usable = await replica.pool.release(pooled, check_health=failed)
+                if failed and not usable:
+                    self._failed(replica)
+                else:
+                    self._succeeded(replica, time.monotonic() - started_at)
+        finally:
+            replica.outstanding -= 1
+            self.last_used = time.monotonic()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [replica.stats() for replica in self.replicas]
+
+    async def close(self):
+        for replica in self.replicas:
+            await replica.pool.close()
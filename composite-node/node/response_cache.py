@@ -0,0 +1,185 @@
+import hashlib
+import importlib
+import math
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+from conversations import to_plain_blocks
+
+# Maps a query to a vector; plug in a real embedding model or a deterministic stub
+Embedder = Callable[[str], Sequence[float]]
+
+# Near-match threshold used when an embedder is configured without one
+DEFAULT_SIMILARITY = 0.95
+
+
+def normalize_query(query: str) -> str:
+    """Casefold, trim and collapse whitespace
+
+    Punctuation is kept: "count > 5", "count < 5" and "count = -5" are
+    different questions.
+    """
+    return " ".join(query.casefold().split())
+
+
+def is_complete_answer(messages: List[dict]) -> bool:
+    """Whether a finished query's messages hold a reusable answer
+
+    Not if a tool call failed, or if the agent loop stopped early on its
+    iteration or token budget (its last reply still asks for tools).
+    """
+    for message in messages:
+        for block in to_plain_blocks(message["content"]):
+            if isinstance(block, dict) and block.get("type") == "tool_result" and block.get("is_error"):
+                return False
+    last = to_plain_blocks(messages[-1]["content"]) if messages else []
+    return not any(isinstance(block, dict) and block.get("type") == "tool_use" for block in last)
+
+
+def ngram_vector(text: str, n: int = 3) -> Dict[str, float]:
+    """Character n-gram counts of a normalized query"""
+    padded = f" {text} "
+    return dict(Counter(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))))
+
+
+def cosine(a, b) -> float:
+    """Cosine similarity of two dense (sequence) or sparse (dict) vectors"""
+    if isinstance(a, dict):
+        dot = sum(value * b.get(key, 0.0) for key, value in a.items())
+        norm_a = math.sqrt(sum(value * value for value in a.values()))
+        norm_b = math.sqrt(sum(value * value for value in b.values()))
+    else:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm_a = math.sqrt(sum(x * x for x in a))
+        norm_b = math.sqrt(sum(y * y for y in b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+def near_match_threshold(similarity: Optional[str], embedder: Optional[str] = None) -> Optional[float]:
+    """The near-match threshold for the ``RESPONSE_CACHE_SIMILARITY`` and ``RESPONSE_CACHE_EMBEDDER`` settings
+
+    Near-matching is off (exact matches only) unless one of them is set:
+    queries differing in a single word such as "resolved"/"unresolved" or
+    "24"/"48" hours look alike to trigrams but ask for different answers.
+    """
+    similarity = (similarity or "").strip().lower()
+    if similarity in ("off", "none"):
+        return None
+    if similarity:
+        return float(similarity)
+    return DEFAULT_SIMILARITY if embedder else None
+
+
+def load_embedder(path: str) -> Embedder:
+    """Import an embedding function given as ``module:function``"""
+    module_name, _, attribute = path.partition(":")
+    if not attribute:
+        raise ValueError("Embedder must be given as 'module:function'")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class CachedResponse:
+    def __init__(self, query: str, response: str, services: Set[str], vector, expires_at: float):
+        self.query = query
+        self.response = response
+        self.services = services
+        self.vector = vector
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Cache of whole ``/api/query`` responses.
+
+    A lookup first tries an exact match on the normalized query's hash, then, if
+    ``similarity_threshold`` is set, the most similar cached query reaching it.
+    Similarity is computed on character trigrams, or on ``embed(query)`` vectors
+    when an embedder is configured. Entries expire after ``ttl`` seconds, the
+    least recently used are dropped beyond ``max_entries``, and entries can be
+    invalidated per service they called.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        max_entries: int = 1000,
+        similarity_threshold: Optional[float] = None,
+        embed: Optional[Embedder] = None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def _key(self, normalized: str) -> str:
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def _vector(self, normalized: str):
+        return self.embed(normalized) if self.embed else ngram_vector(normalized)
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+            del self._entries[key]
+
+    def get(self, query: str) -> Optional[str]:
+        """Return a cached response for this or a sufficiently similar query"""
+        self._expire()
+        normalized = normalize_query(query)
+        key = self._key(normalized)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry.response
+
+        if self.similarity_threshold is not None and self._entries:
+            vector = self._vector(normalized)
+            best_key, best_score = None, 0.0
+            for candidate_key, candidate in self._entries.items():
+                score = cosine(vector, candidate.vector)
+                if score > best_score:
+                    best_key, best_score = candidate_key, score
+            if best_key is not None and best_score >= self.similarity_threshold:
+                self._entries.move_to_end(best_key)
+                self.similar_hits += 1
+                return self._entries[best_key].response
+
+        self.misses += 1
+        return None
+
+    def put(self, query: str, response: str, services: Iterable[str] = ()):
+        """Cache a response along with the services it was derived from"""
+        normalized = normalize_query(query)
+        key = self._key(normalized)
+        vector = self._vector(normalized) if self.similarity_threshold is not None else None
+        self._entries[key] = CachedResponse(query, response, set(services), vector, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, service: Optional[str] = None) -> int:
+        """Drop every entry, or only those that used ``service``; returns the count"""
+        keys = [key for key, entry in self._entries.items() if service is None or service in entry.services]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+        }
+
+
+def services_for_tools(tool_names: List[str], services: Iterable[str]) -> Set[str]:
+    """Map composite tool names (``<service>_<tool>``) back to their services"""
+    return {service for service in services for name in tool_names if name.startswith(f"{service}_")}
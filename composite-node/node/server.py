@@ -1,97 +1,160 @@
-from fastmcp import FastMCP
+from contextlib import asynccontextmanager
+from fastmcp import Context, FastMCP
+import json
 import os
-from MCPClient import MCPClient
+from agent import PROGRESS_LOGGER
+from connection_manager import ChildConnectionManager
+from flat_tools import build_flat_server
+from metrics import REGISTRY, TOOL_CALLS, TOOL_DURATION, timed, trace_context
+from service_registry import ServiceConfig, load_registry
+from single_flight import SingleFlight
+from tool_cache import ToolResultCache
+from tool_catalog import catalog_stats
 
 # This code runs when the module is imported
-# Get configuration from environment variables
-github_pat = os.environ.get('GITHUB_PAT')
-postgres_url = os.environ.get('POSTGRES_URL')
-redis_url = os.environ.get('REDIS_URL')
-sentry_auth_token = os.environ.get('SENTRY_AUTH_TOKEN')
-
-use_github = bool(github_pat)
-use_postgres = bool(postgres_url)
-use_redis = bool(redis_url)
-use_sentry = bool(sentry_auth_token)
-
-# --- Github MCP ---
-github_mcp = FastMCP("Github-MCP")
-
-@github_mcp.tool()
-async def github_tool(user_query: str): 
-    client = None
-    try:
-        client = MCPClient("../mcp-servers/src/github/dist/index.js", github_pat)
-        await client.connect_to_server()
-        response = await client.process_query(user_query)
-        return response
-    finally:
-        if client:
-            await client.cleanup()
-
-# --- Postgres MCP ---
-postgres_mcp = FastMCP("Postgres-MCP")
-@postgres_mcp.tool()
-async def postgres_tool(user_query: str):
-    client = None
-    try:
-        client = MCPClient("../mcp-servers/src/postgres/dist/index.js", postgres_url) 
-        await client.connect_to_server()
-        response = await client.process_query(user_query)
-        return response
-    finally:
-        if client:
-            await client.cleanup()
+# The child services, their commands, transports, pools and cache policies come
+# from the registry file named by FUSION_SERVICES_CONFIG (see
+# services.example.json), or the built-in github/postgres/redis/sentry set.
+# Credentials are read from the environment variables the registry names.
+registry = load_registry()
 
-# --- Redis MCP ---
-redis_mcp = FastMCP("Redis-MCP")
+# "agent" exposes one natural-language sub-agent tool per service; "flat"
+# re-exports each child server's own tools so they are called directly
+tool_mode = os.environ.get('COMPOSITE_TOOL_MODE', 'agent')
 
-@redis_mcp.tool()
-async def redis_tool(user_query: str):
-    client = None
-    try:
-        client = MCPClient("../mcp-servers/src/redis/dist/index.js", redis_url)
-        await client.connect_to_server()
-        response = await client.process_query(user_query)
-        return response
-    finally:
-        if client:
-            await client.cleanup()
+# Results of read-only child tool calls, shared by flat tools and sub-agents
+tool_cache = None
+if os.environ.get('TOOL_CACHE_ENABLED', '1') != '0':
+    tool_cache = ToolResultCache(
+        cacheable_tools=registry.cacheable_tools(),
+        max_bytes=int(os.environ.get('TOOL_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    )
+
+# Identical concurrent calls to read-only child tools share one call; set
+# FUSION_SINGLE_FLIGHT=0 to send every call to the child
+single_flight = SingleFlight() if os.environ.get('FUSION_SINGLE_FLIGHT', '1') != '0' else None
+
+# Persistent connections to the child servers, shared by every tool call. These
+# settings are the defaults for services that do not set their own. They apply
+# to this process only: the API server runs one server.py per pooled composite
+# session, so across the node a child can see CHILD_POOL_MAX_SIZE (and
+# CHILD_TOOL_RATE_LIMITS) times --pool-max-size, and each session keeps its
+# own tool cache.
+# CHILD_TOOL_RATE_LIMITS caps tool calls per minute per child, e.g. '{"github": 60}'
+connections = ChildConnectionManager(
+    min_size=int(os.environ.get('CHILD_POOL_MIN_SIZE', '1')),
+    max_size=int(os.environ.get('CHILD_POOL_MAX_SIZE', '4')),
+    tool_cache=tool_cache,
+    acquire_timeout=float(os.environ.get('CHILD_ACQUIRE_TIMEOUT', '30')),
+    connect_timeout=float(os.environ.get('CHILD_CONNECT_TIMEOUT', '30')),
+    tool_rate_limits={**registry.tool_rate_limits(), **json.loads(os.environ.get('CHILD_TOOL_RATE_LIMITS', '{}'))},
+    balancing=os.environ.get('CHILD_BALANCING', 'p2c'),
+    max_failures=int(os.environ.get('CHILD_MAX_FAILURES', '3')),
+    ejection_time=float(os.environ.get('CHILD_EJECTION_TIME', '30')),
+    idle_timeout=float(os.environ.get('CHILD_IDLE_TIMEOUT', '300')),
+    single_flight=single_flight,
+    read_only=registry.is_read_only_tool,
+)
+# <SERVICE>_MCP_URL (e.g. GITHUB_MCP_URL=http://10.0.0.5:8000/sse) points a
+# service at shared child servers instead of its registry entry; a comma
+# separated list of URLs makes each one a replica. Local scripts are run as
+# CHILD_REPLICAS replicas unless the registry says otherwise.
+# CHILD_MCP_HEADERS is a JSON object of headers sent to every remote child,
+# e.g. for authentication
+child_headers = json.loads(os.environ.get('CHILD_MCP_HEADERS', 'null'))
+child_replicas = int(os.environ.get('CHILD_REPLICAS', '1'))
+
+for service in registry.enabled():
+    for spec in service.child_specs(default_replicas=child_replicas, headers=child_headers):
+        connections.register(spec)
+
+# Child servers start on their first call and stop after CHILD_IDLE_TIMEOUT
+# seconds without one (0 keeps them running). Services listed in CHILD_PREWARM
+# (e.g. "sentry,github") or marked "prewarm" in the registry start with the
+# composite server and stay running.
+prewarm_names = {name.strip() for name in os.environ.get('CHILD_PREWARM', '').split(',') if name.strip()}
+prewarm = [service.name for service in registry.enabled() if service.prewarm or service.name in prewarm_names]
 
-# --- Sentry MCP ---
-sentry_mcp = FastMCP("Sentry-MCP")
+def forward_progress(ctx: Context, service: str):
+    """Report a sub-agent's tool calls to the composite client as MCP log messages"""
+    async def on_event(event: dict):
+        if event["type"] in ("tool_start", "tool_end"):
+            await ctx.log("info", json.dumps({"service": service, **event}, default=str), logger_name=PROGRESS_LOGGER)
+    return on_event
 
-@sentry_mcp.tool()
-async def sentry_tool(user_query: str):
-    client = None
+def build_agent_server(service: ServiceConfig) -> FastMCP:
+    """A server with one natural-language sub-agent tool, ``<service>_tool``
+
+    Mounted under the service name, it is listed as ``<service>_<service>_tool``.
+    Its child server is only started when the tool is first called.
+    """
+    agent_mcp = FastMCP(f"{service.name.capitalize()}-MCP")
+
+    async def agent_tool(user_query: str, ctx: Context):
+        # Continue the composite client's trace, if it sent one
+        traceparent = getattr(ctx.request_context.meta, "traceparent", None)
+        with trace_context(traceparent), timed("agent_tool", TOOL_DURATION, TOOL_CALLS, service=service.name, tool=service.agent_tool):
+            async with connections.session(service.name) as client:
+                return await client.process_query(user_query, on_event=forward_progress(ctx, service.name))
+
+    agent_mcp.add_tool(agent_tool, name=service.agent_tool, description=service.description)
+    return agent_mcp
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    if prewarm:
+        await connections.prewarm(prewarm)
+    if tool_mode == "flat":
+        # Child tool lists are only known once the children are running. Those
+        # not prewarmed are stopped again once they have been idle long enough.
+        for service in registry.enabled():
+            try:
+                server.mount(service.name, await build_flat_server(connections, service.name))
+            except Exception as e:
+                print(f"Warning: Could not mount {service.name} tools: {e}")
     try:
-        client = MCPClient("../mcp-servers/src/sentry/src/mcp_server_sentry/server.py", sentry_auth_token)
-        await client.connect_to_server()
-        response = await client.process_query(user_query)
-        return response
+        yield {}
     finally:
-        if client:
-            await client.cleanup()
+        # Child servers live as long as the composite server does
+        await connections.close()
 
 # Create the composite MCP
-mcp = FastMCP("Composite")
+mcp = FastMCP("Composite", lifespan=lifespan)
 
 @mcp.tool()
 def ping(): 
     return "Composite OK"
 
-# Mount MCPs that have their environment variables set
-if use_github:
-    mcp.mount("github", github_mcp)
-    
-if use_postgres:
-    mcp.mount("postgres", postgres_mcp)
-    
-if use_redis:
-    mcp.mount("redis", redis_mcp)
-    
-if use_sentry:
-    mcp.mount("sentry", sentry_mcp)
+@mcp.resource("stats://tool-catalog")
+def tool_catalog_stats() -> str:
+    """Tool catalog cache hits and misses for the child server sessions"""
+    return json.dumps(catalog_stats())
+
+@mcp.resource("stats://replicas")
+def replica_stats() -> str:
+    """Outstanding calls, failures and ejections for each child server replica"""
+    return json.dumps(connections.stats())
+
+@mcp.resource("metrics://snapshot")
+def metrics_snapshot() -> str:
+    """Phase, LLM and tool call metrics of this process, rendered by the API server's /metrics"""
+    return json.dumps({"pid": os.getpid(), "metrics": REGISTRY.snapshot()})
+
+@mcp.resource("stats://single-flight")
+def single_flight_stats() -> str:
+    """Child tool calls executed and calls that shared one already in flight"""
+    return json.dumps(single_flight.stats() if single_flight is not None else {})
+
+@mcp.resource("stats://tool-cache")
+def tool_cache_stats() -> str:
+    """Hit, miss and eviction counts for the child tool result cache"""
+    return json.dumps(tool_cache.stats() if tool_cache is not None else {})
+
+# Mount the enabled services. In flat mode the child tools are mounted by the
+# lifespan instead.
+if tool_mode != "flat":
+    for service in registry.enabled():
+        mcp.mount(service.name, build_agent_server(service))
 
 if __name__ == "__main__":    
     mcp.run()
\ No newline at end of file
@@ -0,0 +1,220 @@
+import json
+import os
+from typing import Any, Dict, List, Mapping, Optional
+
+from connection_manager import ChildServerSpec
+from tool_cache import DEFAULT_CACHEABLE_TOOLS
+
+# Path of the registry file used when none is given explicitly
+SERVICES_CONFIG_ENV = "FUSION_SERVICES_CONFIG"
+
+# The built-in services, used when no registry file is configured. A registry
+# file has the same shape, plus an optional "defaults" entry merged into every
+# service (see services.example.json).
+DEFAULT_SERVICES: Dict[str, Any] = {
+    "services": {
+        "github": {
+            "script": "../mcp-servers/src/github/dist/index.js",
+            "credential_env": "GITHUB_PAT",
+        },
+        "postgres": {
+            "script": "../mcp-servers/src/postgres/dist/index.js",
+            "credential_env": "POSTGRES_URL",
+            # Every query runs in a READ ONLY transaction
+            "read_only": True,
+        },
+        "redis": {
+            "script": "../mcp-servers/src/redis/dist/index.js",
+            "credential_env": "REDIS_URL",
+        },
+        "sentry": {
+            "script": "../mcp-servers/src/sentry/src/mcp_server_sentry/server.py",
+            "credential_env": "SENTRY_AUTH_TOKEN",
+            "read_only": True,
+        },
+    }
+}
+
+
+class ServiceConfig:
+    """One child service as described by the registry.
+
+    A service is reached either by spawning ``script`` over stdio or by
+    connecting to one or more SSE ``urls`` (``transport: "sse"``). A stdio
+    service may set ``command`` to run something other than python or node
+    (e.g. ``uvx``), with or without a script, plus ``args`` after the script
+    and ``env`` variables for the child. The value of
+    the composite node's ``credential_env`` variable is handed to the child, as
+    ``env_name`` (default ``AUTH_TOKEN``) for Python scripts or as an argument
+    for JavaScript ones. Pool sizes, timeouts, ``replicas`` and ``rate_limit``
+    (tool calls per minute) fall back to the connection manager's defaults when
+    unset; ``cache`` maps read-only tool names to result cache TTLs in seconds.
+    A ``prewarm`` service is started with the composite node and never stopped
+    for being idle. Every tool of a ``read_only`` service, including its
+    sub-agent tool, only reads, so identical concurrent calls may be shared.
+    """
+
+    def __init__(self, name: str, config: Mapping[str, Any]):
+        unknown = set(config) - {
+            "description", "transport", "script", "command", "args", "env", "urls", "credential_env", "env_name", "enabled",
+            "replicas", "pool", "acquire_timeout", "connect_timeout", "idle_timeout", "prewarm", "rate_limit", "cache", "read_only",
+        }
+        if unknown:
+            raise ValueError(f"Unknown settings for service {name}: {', '.join(sorted(unknown))}")
+        self.name = name
+        self.description: Optional[str] = config.get("description")
+        self.transport: str = config.get("transport", "sse" if config.get("urls") else "stdio")
+        if self.transport not in ("stdio", "sse"):
+            raise ValueError(f"Unknown transport for service {name}: {self.transport}")
+        self.script: Optional[str] = config.get("script")
+        urls = config.get("urls") or []
+        self.urls: List[str] = [urls] if isinstance(urls, str) else list(urls)
+        self.command: Optional[str] = config.get("command")
+        args = config.get("args") or []
+        if isinstance(args, str):
+            raise ValueError(f"args of service {name} must be a list")
+        self.args: List[str] = [str(arg) for arg in args]
+        self.env: Dict[str, str] = {key: str(value) for key, value in (config.get("env") or {}).items()}
+        if self.transport == "stdio" and not (self.script or self.command):
+            raise ValueError(f"Service {name} needs a script or command for the stdio transport")
+        if self.transport == "sse" and not self.urls:
+            raise ValueError(f"Service {name} needs urls for the sse transport")
+        self.credential_env: Optional[str] = config.get("credential_env")
+        self.env_name: Optional[str] = config.get("env_name")
+        self.enabled: Optional[bool] = config.get("enabled")
+        self.replicas: Optional[int] = config.get("replicas")
+        pool = config.get("pool") or {}
+        self.pool_min_size: Optional[int] = pool.get("min_size")
+        self.pool_max_size: Optional[int] = pool.get("max_size")
+        self.acquire_timeout: Optional[float] = config.get("acquire_timeout")
+        self.connect_timeout: Optional[float] = config.get("connect_timeout")
+        self.idle_timeout: Optional[float] = config.get("idle_timeout")
+        self.prewarm: bool = bool(config.get("prewarm", False))
+        self.read_only: bool = bool(config.get("read_only", False))
+        self.rate_limit: Optional[float] = config.get("rate_limit")
+        self.cache: Optional[Dict[str, float]] = config.get("cache")
+
+    @property
+    def agent_tool(self) -> str:
+        """Name of the service's sub-agent tool, mounted under the service as ``<service>_<service>_tool``"""
+        return f"{self.name}_tool"
+
+    def credential(self, environ: Mapping[str, str] = os.environ) -> Optional[str]:
+        return environ.get(self.credential_env) if self.credential_env else None
+
+    def remote_urls(self, environ: Mapping[str, str] = os.environ) -> List[str]:
+        """SSE URLs to use, where ``<SERVICE>_MCP_URL`` overrides the registry"""
+        override = environ.get(f"{self.name.upper()}_MCP_URL", "")
+        urls = [url.strip() for url in override.split(",") if url.strip()]
+        return urls or (self.urls if self.transport == "sse" else [])
+
+    def is_enabled(self, environ: Mapping[str, str] = os.environ) -> bool:
+        """Explicitly enabled, or has a credential or remote child to use"""
+        if self.enabled is not None:
+            return self.enabled
+        return bool(self.credential(environ) or self.remote_urls(environ))
+
+    def child_specs(self, environ: Mapping[str, str] = os.environ, default_replicas: int = 1, headers: Optional[Dict[str, str]] = None) -> List[ChildServerSpec]:
+        """Connection specs for the service: one per remote URL, or the local script"""
+        options = dict(
+            env_variable=self.credential(environ),
+            env_name=self.env_name,
+            min_size=self.pool_min_size,
+            max_size=self.pool_max_size,
+            acquire_timeout=self.acquire_timeout,
+            connect_timeout=self.connect_timeout,
+            idle_timeout=self.idle_timeout,
+        )
+        urls = self.remote_urls(environ)
+        if urls:
+            return [ChildServerSpec(self.name, url, headers=headers, **options) for url in urls]
+        return [ChildServerSpec(
+            self.name,
+            self.script,
+            replicas=self.replicas or default_replicas,
+            command=self.command,
+            args=self.args,
+            env=self.env,
+            **options,
+        )]
+
+
+class ServiceRegistry:
+    """The child services a composite node can mount, loaded from a config file"""
+
+    def __init__(self, config: Mapping[str, Any]):
+        defaults = config.get("defaults") or {}
+        services = config.get("services")
+        if not services:
+            raise ValueError("Service registry must list at least one service")
+        self.services: Dict[str, ServiceConfig] = {
+            name: ServiceConfig(name, {**defaults, **(service or {})}) for name, service in services.items()
+        }
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.services)
+
+    def enabled(self, environ: Mapping[str, str] = os.environ) -> List[ServiceConfig]:
+        return [service for service in self.services.values() if service.is_enabled(environ)]
+
+    def credential_envs(self) -> List[str]:
+        """Environment variables holding the services' credentials"""
+        names = [service.credential_env for service in self.services.values() if service.credential_env]
+        # Services may share a credential
+        return list(dict.fromkeys(names))
+
+    def cacheable_tools(self) -> Dict[str, Dict[str, float]]:
+        """Cache policies: the built-in allowlist, replaced per service by ``cache``"""
+        policies = {name: dict(tools) for name, tools in DEFAULT_CACHEABLE_TOOLS.items()}
+        for service in self.services.values():
+            if service.cache is not None:
+                policies[service.name] = dict(service.cache)
+        return policies
+
+    def is_read_only_tool(self, service: str, tool: str) -> bool:
+        """Whether a child tool only reads: all tools of a read-only service, or a cacheable one"""
+        config = self.services.get(service)
+        if config is None:
+            return False
+        cacheable = config.cache if config.cache is not None else DEFAULT_CACHEABLE_TOOLS.get(service, {})
+        return config.read_only or tool in cacheable
+
+    def is_read_only(self, composite_tool: str) -> bool:
+        """Whether a composite tool only reads
+
+        ``composite_tool`` is a service's sub-agent tool as mounted in agent
+        mode (``<service>_<service>_tool``) or, in flat mode, a child tool
+        mounted as ``<service>_<tool>``.
+        """
+        matches = [name for name in self.services if composite_tool.startswith(f"{name}_")]
+        if not matches:
+            return False
+        service = max(matches, key=len)
+        tool = composite_tool[len(service) + 1:]
+        if tool == self.services[service].agent_tool:
+            return self.services[service].read_only
+        return self.is_read_only_tool(service, tool)
+
+    def tool_rate_limits(self) -> Dict[str, float]:
+        return {service.name: service.rate_limit for service in self.services.values() if service.rate_limit}
+
+
+def load_registry(path: Optional[str] = None) -> ServiceRegistry:
+    """Load the registry from ``path`` or ``$FUSION_SERVICES_CONFIG``, else the built-in services
+
+    JSON files are always supported; ``.yaml``/``.yml`` files need PyYAML.
+    """
+    path = path or os.environ.get(SERVICES_CONFIG_ENV)
+    if not path:
+        return ServiceRegistry(DEFAULT_SERVICES)
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required for YAML service registries; install it or use JSON")
+            config = yaml.safe_load(f)
+        else:
+            config = json.load(f)
+    return ServiceRegistry(config)
@@ -0,0 +1,257 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Callable, List, Optional
+
+
+class PooledSession:
+    """A connected client whose connection is owned by a dedicated task.
+
+    ``stdio_client`` and ``ClientSession`` enter anyio cancel scopes, which must be
+    exited by the same task that entered them. Each pooled client is therefore
+    connected and cleaned up inside its own long-lived task instead of by whichever
+    request happens to borrow it.
+    """
+
+    def __init__(self, client: Any, health_check_timeout: float = 5.0, connect_timeout: Optional[float] = None):
+        self.client = client
+        self.health_check_timeout = health_check_timeout
+        self.connect_timeout = connect_timeout
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def start(self):
+        """Connect the client in its owner task and wait until it is ready"""
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(asyncio.shield(self._ready.wait()), self.connect_timeout)
+        except asyncio.TimeoutError:
+            # A child that dies during the handshake can leave it waiting forever
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            raise TimeoutError(f"Timed out after {self.connect_timeout}s connecting to the server")
+        if self._error is not None:
+            raise self._error
+
+    async def _run(self):
+        try:
+            await self.client.connect_to_server()
+        except asyncio.CancelledError:
+            # start() timed out: close what the handshake opened, in this task
+            try:
+                await self.client.cleanup()
+            except BaseException as e:
+                print(f"Warning: Error cleaning up pooled session: {e}")
+            raise
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+
+        self._ready.set()
+        try:
+            await self._closing.wait()
+        finally:
+            try:
+                await self.client.cleanup()
+            except Exception as e:
+                print(f"Warning: Error cleaning up pooled session: {e}")
+
+    @property
+    def alive(self) -> bool:
+        """Whether the owner task is still holding an open connection"""
+        return self._task is not None and not self._task.done() and not self._closing.is_set()
+
+    async def is_healthy(self) -> bool:
+        """Ping the server to confirm the connection still works"""
+        if not self.alive or self.client.session is None:
+            return False
+        try:
+            await asyncio.wait_for(self.client.session.send_ping(), self.health_check_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        """Signal the owner task to clean up and wait for it to finish"""
+        self._closing.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except BaseException as e:
+                print(f"Warning: Pooled session exited with error: {e}")
+
+
+class SessionPool:
+    """A bounded pool of warm, connected clients.
+
+    ``factory`` builds an unconnected client exposing ``connect_to_server``,
+    ``cleanup`` and ``session`` (``MCPClient`` and ``CompositeServer`` both do).
+    At most ``max_size`` clients exist at once; ``min_size`` of them are connected
+    up front and kept warm by a background health check.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 4,
+        health_check_interval: float = 30.0,
+        health_check_timeout: float = 5.0,
+        acquire_timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.acquire_timeout = acquire_timeout
+        self.connect_timeout = connect_timeout
+        self._idle: List[PooledSession] = []
+        self._sessions: List[PooledSession] = []
+        self._slots = asyncio.Semaphore(max_size)
+        self._size = 0
+        self._closed = False
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def size(self) -> int:
+        """Number of connected clients, idle or checked out"""
+        return self._size
+
+    @property
+    def clients(self) -> List[Any]:
+        """Every connected client, idle or checked out"""
+        return [pooled.client for pooled in self._sessions if pooled.alive]
+
+    @property
+    def idle(self) -> int:
+        """Number of connected clients waiting in the pool"""
+        return len(self._idle)
+
+    async def start(self):
+        """Connect ``min_size`` clients and start the health check loop"""
+        await self._fill()
+        if self.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _create(self) -> PooledSession:
+        self._size += 1
+        pooled = PooledSession(self.factory(), self.health_check_timeout, self.connect_timeout)
+        try:
+            await pooled.start()
+        except BaseException:
+            self._size -= 1
+            raise
+        self._sessions.append(pooled)
+        return pooled
+
+    async def _discard(self, pooled: PooledSession):
+        self._size -= 1
+        self._sessions.remove(pooled)
+        await pooled.close()
+
+    async def _fill(self):
+        while not self._closed and self._size < self.min_size:
+            self._idle.append(await self._create())
+
+    async def _health_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            for pooled in list(self._idle):
+                if pooled not in self._idle or await pooled.is_healthy():
+                    continue
+                if pooled not in self._idle:
+                    # Checked out while we were pinging; release() will re-check it
+                    continue
+                print("Warning: Pooled session failed health check, reconnecting")
+                self._idle.remove(pooled)
+                await self._discard(pooled)
+            try:
+                await self._fill()
+            except Exception as e:
+                print(f"Warning: Could not replenish session pool: {e}")
+
+    async def acquire(self, prefer: Any = None) -> PooledSession:
+        """Check a healthy client out of the pool, connecting a new one if needed
+
+        If the client ``prefer`` is idle it is handed out first, so a caller can
+        keep coming back to the same warm session without reserving it.
+        """
+        if self._closed:
+            raise RuntimeError("Session pool is closed")
+        if self.acquire_timeout is None:
+            await self._slots.acquire()
+        else:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Timed out after {self.acquire_timeout}s waiting for a free session")
+        try:
+            for pooled in self._idle:
+                if prefer is not None and pooled.client is prefer:
+                    self._idle.remove(pooled)
+                    self._idle.append(pooled)
+                    break
+            while self._idle:
+                pooled = self._idle.pop()
+                if pooled.alive:
+                    return pooled
+                print("Warning: Discarding dead pooled session")
+                await self._discard(pooled)
+            return await self._create()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, pooled: PooledSession, check_health: bool = False) -> bool:
+        """Return a client to the pool, dropping it if it is no longer usable
+
+        Returns whether the client was usable and went back to the pool.
+        """
+        try:
+            usable = pooled.alive and not self._closed
+            if usable and check_health:
+                usable = await pooled.is_healthy()
+            if usable:
+                self._idle.append(pooled)
+            else:
+                await self._discard(pooled)
+            return usable
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def session(self, prefer: Any = None):
+        """Borrow a connected client for the duration of the ``async with`` block
+
+        If the block raises, the client is health-checked before it goes back to
+        the pool so a broken connection is replaced rather than handed out again.
+        ``prefer`` is passed on to ``acquire``.
+        """
+        pooled = await self.acquire(prefer)
+        failed = False
+        try:
+            yield pooled.client
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self.release(pooled, check_health=failed)
+
+    async def close(self):
+        """Close every idle client and stop handing out new ones"""
+        self._closed = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+        idle, self._idle = self._idle, []
+        for pooled in idle:
+            await self._discard(pooled)
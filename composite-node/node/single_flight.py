@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import mcp.types as types
+
+from metrics import REGISTRY, call_tool_traced
+from tool_cache import canonical_arguments
+
+COALESCED_CALLS = REGISTRY.counter("fusion_coalesced_calls_total", "Tool calls that shared an identical call already in flight", ["service", "tool"])
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs concurrent calls with the same key once and shares the outcome.
+
+    The first caller for a key starts the work in its own task; callers that
+    arrive while it is running wait for the same task and get the same result
+    or exception. The work is cancelled only once every caller waiting for it
+    has gone away. Nothing is remembered after the call completes, so this
+    complements rather than replaces ``ToolResultCache``.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def is_running(self, key: Hashable) -> bool:
+        """Whether a call with ``key`` is in flight, so ``do`` would join it"""
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": self.in_flight}
+
+
+class SingleFlightToolCaller:
+    """Wraps a tool caller so identical concurrent calls to read-only tools run once
+
+    ``read_only(name)`` decides which tools may be shared; calls to any other
+    tool always go through on their own. ``service`` scopes the keys and labels
+    the ``fusion_coalesced_calls_total`` metric.
+    """
+
+    def __init__(self, session: Any, flight: SingleFlight, service: str, read_only: Callable[[str], bool]):
+        self.session = session
+        self.flight = flight
+        self.service = service
+        self.read_only = read_only
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None) -> types.CallToolResult:
+        if not self.read_only(name):
+            return await call_tool_traced(self.session, name, arguments)
+        key = (self.service, name, canonical_arguments(arguments))
+        if self.flight.is_running(key):
+            COALESCED_CALLS.inc(service=self.service, tool=name)
+        return await self.flight.do(key, lambda: call_tool_traced(self.session, name, arguments))
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def test_full_queue_is_rejected_with_429():
+    async def run():
+        admission = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+        started_at = await admission.acquire()
+        queued = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.stats()["waiting"] == 1
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        assert rejected.value.status_code == 429 and rejected.value.retry_after >= 1
+
+        # The queued query gets the slot once it is released
+        admission.release(started_at)
+        admission.release(await queued)
+        assert admission.stats() == {"in_flight": 0, "waiting": 0, "admitted": 2, "rejected_queue_full": 1, "rejected_timeout": 0}
+
+    asyncio.run(run())
+
+
+def test_queue_timeout_is_rejected_with_503():
+    async def run():
+        admission = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=0.05)
+        started_at = await admission.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        assert rejected.value.status_code == 503 and rejected.value.retry_after >= 1
+        assert admission.stats()["waiting"] == 0 and admission.stats()["rejected_timeout"] == 1
+        admission.release(started_at)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("max_queue, status_code", [(0, 429), (1, 503)])
+def test_rejections_carry_retry_after_header(monkeypatch, max_queue, status_code):
+    """``composite_server`` turns a rejection into an HTTP error with ``Retry-After``"""
+    from fastapi import HTTPException
+
+    import composite_server
+
+    admission = AdmissionController(max_in_flight=1, max_queue=max_queue, queue_timeout=0.05)
+    monkeypatch.setattr(composite_server.app.state, "admission", admission, raising=False)
+
+    async def run():
+        started_at = await composite_server.admit_query()
+        try:
+            with pytest.raises(HTTPException) as rejected:
+                await composite_server.admit_query()
+        finally:
+            admission.release(started_at)
+        return rejected.value
+
+    error = asyncio.run(run())
+    assert error.status_code == status_code
+    assert int(error.headers["Retry-After"]) >= 1
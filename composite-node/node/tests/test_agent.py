@@ -0,0 +1,136 @@
+import asyncio
+from types import SimpleNamespace
+from typing import List, Optional
+
+import mcp.types as types
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+
+from agent import RecordingToolCaller, run_agent_loop
+
+
+class FakeLLM:
+    """Answers ``messages.create`` with scripted turns and records each request"""
+
+    def __init__(self, turns: List[list], usage: Optional[dict] = None):
+        self.turns = list(turns)
+        self.usage = usage or {"input_tokens": 10, "output_tokens": 5}
+        self.requests: List[dict] = []
+        self.messages = SimpleNamespace(create=self.create)
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        content = self.turns.pop(0) if self.turns else [TextBlock(type="text", text="done")]
+        return Message(
+            id=f"msg_{len(self.requests)}",
+            type="message",
+            role="assistant",
+            model=kwargs["model"],
+            content=content,
+            stop_reason="tool_use" if any(block.type == "tool_use" for block in content) else "end_turn",
+            usage=Usage(**self.usage),
+        )
+
+
+def tool_use(index: int, delay: float) -> ToolUseBlock:
+    return ToolUseBlock(type="tool_use", id=f"toolu_{index}", name="sleep", input={"delay": delay})
+
+
+class SleepingTools:
+    """A tool session whose ``sleep`` tool waits ``delay`` seconds, tracking concurrency"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None) -> types.CallToolResult:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(arguments["delay"])
+        finally:
+            self.running -= 1
+        return types.CallToolResult(content=[types.TextContent(type="text", text=f"slept {arguments['delay']}")])
+
+
+def run_loop(llm: FakeLLM, session, messages: List[dict], **kwargs) -> str:
+    return asyncio.run(run_agent_loop(llm, session, messages, [], model="test-model", max_tokens=100, **kwargs))
+
+
+def test_tool_results_follow_tool_use_order():
+    # The first tool finishes last
+    llm = FakeLLM([[tool_use(0, 0.05), tool_use(1, 0.01), tool_use(2, 0.0)]])
+    tools = SleepingTools()
+    caller = RecordingToolCaller(tools)
+    messages = [{"role": "user", "content": "go"}]
+
+    run_loop(llm, caller, messages)
+
+    results = messages[2]["content"]
+    assert [result["tool_use_id"] for result in results] == ["toolu_0", "toolu_1", "toolu_2"]
+    assert [result["content"][0]["text"] for result in results] == ["slept 0.05", "slept 0.01", "slept 0.0"]
+    assert caller.tool_names == ["sleep"] * 3
+    assert tools.max_running == 3
+    assert messages[-1]["role"] == "assistant" and len(llm.requests) == 2
+
+
+def test_parallel_tools_are_bounded():
+    llm = FakeLLM([[tool_use(index, 0.01) for index in range(6)]])
+    tools = SleepingTools()
+    messages = [{"role": "user", "content": "go"}]
+
+    run_loop(llm, RecordingToolCaller(tools), messages, max_parallel_tools=2)
+
+    assert tools.max_running == 2
+    assert [result["tool_use_id"] for result in messages[2]["content"]] == [f"toolu_{index}" for index in range(6)]
+
+
+def test_loop_stops_at_iteration_cap():
+    llm = FakeLLM([[tool_use(index, 0.0)] for index in range(10)])
+    messages = [{"role": "user", "content": "go"}]
+
+    text = run_loop(llm, RecordingToolCaller(SleepingTools()), messages, max_iterations=3)
+
+    assert len(llm.requests) == 3
+    assert text.endswith("[Stopped after 3 model calls]")
+    # The last reply's tool calls are not run
+    assert messages[-1]["role"] == "assistant"
+
+
+def test_failed_tool_is_reported_to_the_model():
+    class BrokenTools:
+        async def call_tool(self, name, arguments=None):
+            raise ConnectionError("child went away")
+
+    llm = FakeLLM([[tool_use(0, 0.0)]])
+    messages = [{"role": "user", "content": "go"}]
+
+    run_loop(llm, RecordingToolCaller(BrokenTools()), messages)
+
+    (result,) = messages[2]["content"]
+    assert result["is_error"] and "child went away" in result["content"]
+
+
+def test_tool_events_without_streaming():
+    # FakeLLM has no messages.stream, so a streamed call would fail
+    llm = FakeLLM([[tool_use(0, 0.0)]])
+    events = []
+
+    async def on_event(event):
+        events.append(event["type"])
+
+    run_loop(llm, RecordingToolCaller(SleepingTools()), [{"role": "user", "content": "go"}], on_event=on_event, stream_text=False)
+
+    assert events == ["tool_start", "tool_end"]
+    assert len(llm.requests) == 2
+
+
+def test_cached_tokens_count_towards_the_budget():
+    # Each reply is tiny but reads a large cached prefix
+    usage = {"input_tokens": 1, "output_tokens": 1, "cache_read_input_tokens": 1000, "cache_creation_input_tokens": None}
+    llm = FakeLLM([[tool_use(index, 0.0)] for index in range(5)], usage=usage)
+    messages = [{"role": "user", "content": "go"}]
+
+    text = run_loop(llm, RecordingToolCaller(SleepingTools()), messages, max_total_tokens=500)
+
+    assert len(llm.requests) == 1
+    assert text.endswith("[Stopped after spending 1002 tokens]")
@@ -0,0 +1,103 @@
+import asyncio
+
+from connection_manager import ChildConnectionManager, ChildServerSpec
+
+
+class StubSession:
+    async def send_ping(self):
+        pass
+
+
+class StubClient:
+    def __init__(self):
+        self.session = None
+        self.closed = False
+
+    async def connect_to_server(self):
+        self.session = StubSession()
+
+    async def cleanup(self):
+        self.closed = True
+
+
+def make_manager(names, **kwargs):
+    """A manager whose child servers are stub clients, recorded per name"""
+    manager = ChildConnectionManager(min_size=1, max_size=1, health_check_interval=0, **kwargs)
+    clients = {name: [] for name in names}
+    for name in names:
+        spec = ChildServerSpec(name, f"{name}.py")
+
+        def create_client(name=name):
+            clients[name].append(StubClient())
+            return clients[name][-1]
+
+        spec.create_client = create_client
+        manager.register(spec)
+    return manager, clients
+
+
+async def use(manager, name):
+    async with manager.session(name) as client:
+        return client
+
+
+def make_idle(manager, name, seconds):
+    manager._replica_sets[name].last_used -= seconds
+
+
+def test_idle_child_is_stopped_and_restarted_on_demand():
+    async def run():
+        manager, clients = make_manager(["svc"], idle_timeout=60)
+        first = await use(manager, "svc")
+
+        assert await manager.reap_idle() == []
+        make_idle(manager, "svc", 61)
+        assert await manager.reap_idle() == ["svc"]
+        assert first.closed and manager.stats() == {}
+
+        # The next call starts the child again
+        second = await use(manager, "svc")
+        assert second is not first and len(clients["svc"]) == 2
+        await manager.close()
+
+    asyncio.run(run())
+
+
+def test_prewarmed_and_busy_children_are_kept():
+    async def run():
+        manager, clients = make_manager(["pinned", "busy"], idle_timeout=60)
+        await manager.prewarm(["pinned"])
+        async with manager.session("busy"):
+            for name in ("pinned", "busy"):
+                make_idle(manager, name, 600)
+            assert await manager.reap_idle() == []
+        assert not clients["pinned"][0].closed and not clients["busy"][0].closed
+        await manager.close()
+
+    asyncio.run(run())
+
+
+def test_service_idle_timeout_overrides_the_default():
+    async def run():
+        manager, clients = make_manager(["svc"], idle_timeout=60)
+        manager._specs["svc"][0].idle_timeout = 0
+        await use(manager, "svc")
+        make_idle(manager, "svc", 600)
+        assert await manager.reap_idle() == []
+        await manager.close()
+
+    asyncio.run(run())
+
+
+def test_reaper_loop_stops_idle_children():
+    async def run():
+        manager, clients = make_manager(["svc"], idle_timeout=0.05)
+        await use(manager, "svc")
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if clients["svc"][0].closed:
+                break
+        assert clients["svc"][0].closed and manager.stats() == {}
+        await manager.close()
+
+    asyncio.run(run())
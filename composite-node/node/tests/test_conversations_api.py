@@ -0,0 +1,118 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from fastapi import HTTPException, Response
+from starlette.requests import Request
+
+import composite_server
+from admission import AdmissionController
+from composite_server import QueryRequest, api_query, api_query_stream
+from conversations import ConversationStore, add_query
+from session_pool import SessionPool
+
+
+class StubSession:
+    async def send_ping(self):
+        pass
+
+
+class StubServer:
+    """A composite session that answers each query with its number and remembers the history it got"""
+
+    answered = 0
+
+    def __init__(self):
+        self.session = None
+        self.histories = []
+        self.last_tools_used = []
+        self.last_messages = []
+
+    async def connect_to_server(self):
+        self.session = StubSession()
+
+    async def cleanup(self):
+        pass
+
+    async def process_query(self, query, on_event=None, history=None):
+        StubServer.answered += 1
+        self.histories.append(list(history or []))
+        answer = f"answer {StubServer.answered}"
+        if on_event is not None:
+            await on_event({"type": "text", "text": answer})
+        self.last_messages = add_query(list(history or []), query) + [{"role": "assistant", "content": answer}]
+        return answer
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """The API's state with a pool of one stub composite session"""
+    servers = []
+
+    def factory():
+        servers.append(StubServer())
+        return servers[-1]
+
+    state = composite_server.app.state
+    for name, value in {
+        "server_script": "server.py",
+        "service_env": {},
+        "pool": SessionPool(factory, min_size=0, max_size=1, health_check_interval=0),
+        "conversations": ConversationStore(),
+        "admission": AdmissionController(),
+    }.items():
+        monkeypatch.setattr(state, name, value, raising=False)
+    return servers
+
+
+def http_request() -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/api/query", "headers": []})
+
+
+async def query(text: str, session_id: str = None):
+    return await api_query(QueryRequest(query=text, session_id=session_id), http_request(), Response())
+
+
+def test_server_generates_the_session_id(api):
+    async def run():
+        first = await query("which errors are new?")
+        follow_up = await query("and yesterday?", first.session_id)
+        # Each query without an id starts its own conversation
+        other = await query("which errors are new?")
+        await composite_server.app.state.pool.close()
+        return first, follow_up, other
+
+    first, follow_up, other = asyncio.run(run())
+    assert uuid.UUID(first.session_id).version == 4
+    assert follow_up.session_id == first.session_id
+    assert other.session_id != first.session_id
+    (server,) = api
+    assert server.histories[1] == [
+        {"role": "user", "content": "which errors are new?"},
+        {"role": "assistant", "content": first.response},
+    ]
+
+
+def test_unknown_session_id_is_rejected(api):
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(query("hello", "chat-42"))
+    assert rejected.value.status_code == 404
+    assert composite_server.app.state.conversations.get("chat-42") is None
+    assert api == []
+
+
+def test_stream_done_event_carries_the_session_id(api):
+    async def run():
+        response = await api_query_stream(QueryRequest(query="which errors are new?"), http_request())
+        events = []
+        async for chunk in response.body_iterator:
+            event, data = chunk.strip().split("\n")
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+        await composite_server.app.state.pool.close()
+        return events
+
+    events = asyncio.run(run())
+    assert [event for event, _ in events] == ["text", "done"]
+    session_id = events[-1][1]["session_id"]
+    assert composite_server.app.state.conversations.get(session_id) is not None
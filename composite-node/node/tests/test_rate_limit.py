@@ -0,0 +1,57 @@
+import asyncio
+import importlib
+
+import anthropic
+import httpx
+import pytest
+
+import rate_limit
+
+
+@pytest.fixture
+def unconfigured(monkeypatch):
+    """``rate_limit`` as loaded without any ANTHROPIC_RPM/TPM settings"""
+    for name in ("ANTHROPIC_RPM", "ANTHROPIC_TPM", "ANTHROPIC_RATE_LIMITS"):
+        monkeypatch.delenv(name, raising=False)
+    yield importlib.reload(rate_limit)
+    monkeypatch.undo()
+    importlib.reload(rate_limit)
+
+
+def rate_limit_error(retry_after: str = "0") -> anthropic.RateLimitError:
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=httpx.Request("POST", "http://stub/v1/messages"))
+    return anthropic.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_unlimited_unless_configured(unconfigured):
+    limiter = unconfigured.RateLimiter()
+    budget = limiter.budget("model")
+    assert budget.requests is None and budget.tokens is None
+
+    async def burst():
+        await asyncio.gather(*[limiter.acquire("model", 100000) for _ in range(500)])
+
+    asyncio.run(asyncio.wait_for(burst(), 1.0))
+    assert limiter.stats()["request_rate_per_minute"] == {}
+
+
+def test_per_model_limits(unconfigured):
+    limiter = unconfigured.RateLimiter({"limited": {"rpm": 60, "tpm": 6000}})
+    assert limiter.budget("limited").requests.rate == 1.0
+    assert limiter.budget("other").requests is None
+
+
+def test_unlimited_still_retries_rate_limits(unconfigured, monkeypatch):
+    monkeypatch.setattr(unconfigured, "backoff_base", 0.0)
+    limiter = unconfigured.RateLimiter()
+    calls = 0
+
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        if calls < 3:
+            raise rate_limit_error()
+        return "ok"
+
+    assert asyncio.run(limiter.call("model", 10, flaky)) == "ok"
+    assert limiter.throttled == 2 and limiter.retries == 2
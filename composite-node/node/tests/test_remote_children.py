@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from connection_manager import ChildConnectionManager
+from service_registry import ServiceRegistry
+
+NODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB_CHILD = os.path.join(NODE_DIR, "bench", "stub_child.py")
+REGISTRY = {"services": {"stub": {"script": STUB_CHILD, "description": "Stub service"}}}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def stub_child_url():
+    """``bench/stub_child.py`` serving MCP over SSE on loopback"""
+    port = free_port()
+    child = subprocess.Popen(
+        [sys.executable, STUB_CHILD, "--transport", "sse", "--host", "127.0.0.1", "--port", str(port)],
+        env={**os.environ, "STUB_CHILD_LATENCY": "0"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if child.poll() is not None or time.monotonic() > deadline:
+                child.kill()
+                pytest.fail("stub child did not start")
+            time.sleep(0.1)
+    yield f"http://127.0.0.1:{port}/sse"
+    child.terminate()
+    try:
+        child.wait(5)
+    except subprocess.TimeoutExpired:
+        # An open SSE stream can hold up uvicorn's graceful shutdown
+        child.kill()
+        child.wait()
+
+
+def test_service_mcp_url_selects_remote_child(stub_child_url):
+    registry = ServiceRegistry(REGISTRY)
+    assert registry.enabled({}) == []
+    (service,) = registry.enabled({"STUB_MCP_URL": stub_child_url})
+    (spec,) = service.child_specs({"STUB_MCP_URL": stub_child_url})
+    assert spec.server_script_path == stub_child_url
+    assert spec.create_client().is_remote
+
+
+def test_pooled_sse_session_is_reused(stub_child_url):
+    (service,) = ServiceRegistry(REGISTRY).enabled({"STUB_MCP_URL": stub_child_url})
+
+    async def run():
+        connections = ChildConnectionManager(min_size=1, max_size=1, health_check_interval=0)
+        for spec in service.child_specs({"STUB_MCP_URL": stub_child_url}):
+            connections.register(spec)
+        try:
+            clients = []
+            for index in range(5):
+                result = await connections.call_tool("stub", "echo", {"text": str(index)})
+                assert result.content[0].text == f"echo: {index}"
+                async with connections.session("stub") as client:
+                    clients.append(client)
+            assert all(client is clients[0] for client in clients)
+            assert connections.stats()["stub"][0]["sessions"] == 1
+        finally:
+            await connections.close()
+
+    asyncio.run(run())
+
+
+def test_composite_server_reaches_remote_child(stub_child_url, tmp_path):
+    """``server.py`` in flat mode, pointed at the SSE child by ``STUB_MCP_URL``"""
+    registry_path = tmp_path / "services.json"
+    registry_path.write_text(json.dumps(REGISTRY))
+    env = {
+        **os.environ,
+        "FUSION_SERVICES_CONFIG": str(registry_path),
+        "STUB_MCP_URL": stub_child_url,
+        "COMPOSITE_TOOL_MODE": "flat",
+        "CHILD_POOL_MIN_SIZE": "1",
+        "CHILD_POOL_MAX_SIZE": "1",
+        "TOOL_CACHE_ENABLED": "0",
+    }
+
+    async def run():
+        params = StdioServerParameters(command=sys.executable, args=["server.py"], env=env, cwd=NODE_DIR)
+        async with stdio_client(params) as (read, write), ClientSession(read, write) as session:
+            await session.initialize()
+            tools = [tool.name for tool in (await session.list_tools()).tools]
+            assert "stub_echo" in tools
+            for index in range(5):
+                result = await session.call_tool("stub_echo", {"text": str(index)})
+                assert not result.isError
+                assert result.content[0].text == f"echo: {index}"
+            replicas = json.loads((await session.read_resource("stats://replicas")).contents[0].text)
+            metrics = json.loads((await session.read_resource("metrics://snapshot")).contents[0].text)["metrics"]
+        return replicas, metrics
+
+    replicas, metrics = asyncio.run(asyncio.wait_for(run(), 60))
+    # One SSE session was opened and every call went over it
+    assert replicas["stub"][0]["sessions"] == 1
+    assert replicas["stub"][0]["calls"] >= 5
+    connects = {status: count for (phase, service, status), count in metrics["fusion_phase_total"]["series"] if phase == "spawn" and service == "stub"}
+    assert connects == {"ok": 1}
@@ -0,0 +1,127 @@
+import asyncio
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+import replica_set
+from replica_set import ReplicaSet
+
+
+class FakePool:
+    """Stands in for a replica's ``SessionPool``; ``broken`` makes acquiring fail"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.broken = False
+        self.healthy = True
+        self.size = 1
+
+    async def acquire(self):
+        if self.broken:
+            raise TimeoutError(f"{self.name} has no session")
+        return SimpleNamespace(client=self.name)
+
+    async def release(self, pooled, check_health: bool = False) -> bool:
+        return self.healthy or not check_health
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A manual clock for ejections and a seeded RNG for p2c"""
+    now = [1000.0]
+    monkeypatch.setattr(replica_set, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(replica_set, "random", random.Random(42))
+    return now
+
+
+def make_set(count: int, strategy: str, **kwargs) -> ReplicaSet:
+    return ReplicaSet("svc", [FakePool(f"replica-{index}") for index in range(count)], strategy, **kwargs)
+
+
+def test_least_outstanding_picks_the_least_loaded(clock):
+    replicas = make_set(3, "least_outstanding")
+    loads = {0: 2, 1: 0, 2: 1}
+    for index, outstanding in loads.items():
+        replicas.replicas[index].outstanding = outstanding
+    assert replicas.choose().index == 1
+
+    # Latency weights the load: 1 outstanding call on a slow replica costs more
+    # than 2 on a fast one
+    for replica, latency in zip(replicas.replicas, (0.1, 5.0, 1.0)):
+        replica.latency, replica.completed = latency, 1
+    assert replicas.choose().index == 0
+
+
+def test_p2c_never_picks_the_most_loaded(clock):
+    replicas = make_set(4, "p2c")
+    for replica, outstanding in zip(replicas.replicas, (0, 1, 2, 10)):
+        replica.outstanding = outstanding
+
+    picks = Counter(replicas.choose().index for _ in range(200))
+
+    # The busiest replica always loses its pairing, the idle one always wins its
+    assert picks[3] == 0
+    assert picks[0] > picks[1] > picks[2] > 0
+    assert sum(picks.values()) == 200
+
+
+def test_p2c_is_deterministic_with_a_seeded_rng(monkeypatch, clock):
+    def picks():
+        monkeypatch.setattr(replica_set, "random", random.Random(7))
+        replicas = make_set(5, "p2c")
+        for replica, outstanding in zip(replicas.replicas, (3, 1, 4, 1, 5)):
+            replica.outstanding = outstanding
+        return [replicas.choose().index for _ in range(20)]
+
+    assert picks() == picks()
+
+
+def test_failing_replica_is_ejected_and_readmitted(clock):
+    replicas = make_set(2, "least_outstanding", max_failures=2, ejection_time=30)
+    broken = replicas.replicas[0]
+    broken.pool.broken = True
+
+    async def call():
+        async with replicas.session() as client:
+            return client
+
+    async def run():
+        # Ties go to replica 0, so it is tried until it is ejected
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                await call()
+        assert not broken.available and broken.ejections == 1
+        assert [await call() for _ in range(3)] == ["replica-1"] * 3
+
+        # Back in rotation once the ejection time has passed
+        broken.pool.broken = False
+        clock[0] += 30
+        assert broken.available
+        assert await call() == "replica-0"
+        assert broken.consecutive_failures == 0
+
+    asyncio.run(run())
+    assert replicas.stats()[0]["failures"] == 2
+
+
+def test_unhealthy_session_counts_as_a_failure(clock):
+    replicas = make_set(1, "least_outstanding", max_failures=1)
+    replica = replicas.replicas[0]
+    replica.pool.healthy = False
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            async with replicas.session():
+                raise RuntimeError("call failed")
+
+    asyncio.run(run())
+    assert replica.failures == 1 and replica.ejections == 1 and replica.outstanding == 0
+
+
+def test_every_replica_ejected_still_serves(clock):
+    replicas = make_set(2, "p2c")
+    for replica in replicas.replicas:
+        replica.ejected_until = clock[0] + 30
+    assert replicas.choose() in replicas.replicas
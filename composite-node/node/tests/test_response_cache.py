@@ -0,0 +1,103 @@
+import hashlib
+import re
+
+import pytest
+
+from response_cache import DEFAULT_SIMILARITY, ResponseCache, is_complete_answer, near_match_threshold
+
+QUERY = "Show the 20 most recent unresolved errors in payments-service from the last 24 hours"
+
+# Each changes one key term: negation, a number or the service name
+CHANGED_KEY_TERM = [
+    "Show the 20 most recent resolved errors in payments-service from the last 24 hours",
+    "Show the 20 most recent unresolved errors in payments-service from the last 48 hours",
+    "Show the 10 most recent unresolved errors in payments-service from the last 24 hours",
+    "Show the 20 most recent unresolved errors in payment-service from the last 24 hours",
+]
+
+SYNONYMS = {"latest": "recent", "newest": "recent", "past": "last", "open": "unresolved", "issues": "errors"}
+STOPWORDS = {"show", "list", "me", "the", "most", "in", "from", "for", "over", "of", "what", "are"}
+
+
+def stub_embed(text: str, dimensions: int = 512):
+    """Deterministic bag-of-words embedding with a few synonyms folded together"""
+    vector = [0.0] * dimensions
+    for word in re.findall(r"\w+", text.lower()):
+        word = SYNONYMS.get(word, word)
+        if word not in STOPWORDS:
+            vector[int(hashlib.sha256(word.encode()).hexdigest(), 16) % dimensions] += 1.0
+    return vector
+
+
+def test_exact_match_only_by_default():
+    cache = ResponseCache()
+    cache.put(QUERY, "cached answer")
+    assert cache.get(QUERY) == "cached answer"
+    assert cache.get("  " + QUERY.upper().replace(" ", "\t ") + "\n") == "cached answer"
+    for query in CHANGED_KEY_TERM:
+        assert cache.get(query) is None
+    assert cache.stats()["similar_hits"] == 0
+
+
+@pytest.mark.parametrize("query, other", [
+    ("errors with count > 5", "errors with count < 5"),
+    ("errors with count > 5", "errors with count = 5"),
+    ("errors with count >= 5", "errors with count <= 5"),
+    ("offset -5", "offset 5"),
+])
+def test_punctuation_is_significant(query, other):
+    cache = ResponseCache()
+    cache.put(query, "cached answer")
+    assert cache.get(query) == "cached answer"
+    assert cache.get(other) is None
+
+
+def test_embedding_paraphrase_hits():
+    cache = ResponseCache(similarity_threshold=DEFAULT_SIMILARITY, embed=stub_embed)
+    cache.put(QUERY, "cached answer")
+    paraphrase = "List the 20 latest open issues for payments-service over the past 24 hours"
+    assert cache.get(paraphrase) == "cached answer"
+    assert cache.stats()["similar_hits"] == 1
+
+
+@pytest.mark.parametrize("query", CHANGED_KEY_TERM)
+def test_embedding_changed_key_term_misses(query):
+    cache = ResponseCache(similarity_threshold=DEFAULT_SIMILARITY, embed=stub_embed)
+    cache.put(QUERY, "cached answer")
+    assert cache.get(query) is None
+
+
+def test_invalidate_by_service():
+    cache = ResponseCache()
+    cache.put("sentry errors", "a", {"sentry"})
+    cache.put("redis keys", "b", {"redis"})
+    assert cache.invalidate("sentry") == 1
+    assert cache.get("sentry errors") is None
+    assert cache.get("redis keys") == "b"
+
+
+@pytest.mark.parametrize("similarity, embedder, expected", [
+    (None, None, None),
+    ("", None, None),
+    (None, "embeddings:embed", DEFAULT_SIMILARITY),
+    ("0.9", None, 0.9),
+    ("off", "embeddings:embed", None),
+])
+def test_near_match_threshold(similarity, embedder, expected):
+    assert near_match_threshold(similarity, embedder) == expected
+
+
+def test_incomplete_answers_are_not_cacheable():
+    question = {"role": "user", "content": "q"}
+    tool_use = {"role": "assistant", "content": [{"type": "tool_use", "id": "t1", "name": "sentry", "input": {}}]}
+    answer = {"role": "assistant", "content": [{"type": "text", "text": "a"}]}
+
+    def results(is_error):
+        return {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "r", "is_error": is_error}]}
+
+    assert is_complete_answer([question, answer])
+    assert is_complete_answer([question, tool_use, results(False), answer])
+    # A failed tool call
+    assert not is_complete_answer([question, tool_use, results(True), answer])
+    # Stopped on the iteration or token budget right after asking for tools
+    assert not is_complete_answer([question, tool_use])
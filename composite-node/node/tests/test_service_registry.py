@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from service_registry import DEFAULT_SERVICES, ServiceRegistry
+
+NODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB_CHILD = os.path.join(NODE_DIR, "bench", "stub_child.py")
+REGISTRY = {"services": {
+    "stub": {"script": STUB_CHILD, "enabled": True, "read_only": True},
+    "writer": {"script": STUB_CHILD, "enabled": True},
+}}
+
+
+def list_composite_tools(registry_path: str, tool_mode: str) -> list:
+    """The tool names ``server.py`` lists for a registry in the given tool mode"""
+    env = {**os.environ, "FUSION_SERVICES_CONFIG": registry_path, "COMPOSITE_TOOL_MODE": tool_mode, "STUB_CHILD_LATENCY": "0"}
+
+    async def run():
+        params = StdioServerParameters(command=sys.executable, args=["server.py"], env=env, cwd=NODE_DIR)
+        async with stdio_client(params) as (read, write), ClientSession(read, write) as session:
+            await session.initialize()
+            return [tool.name for tool in (await session.list_tools()).tools]
+
+    return asyncio.run(asyncio.wait_for(run(), 60))
+
+
+@pytest.mark.parametrize("tool_mode, read_only, writable", [
+    ("agent", "stub_stub_tool", "writer_writer_tool"),
+    ("flat", "stub_echo", "writer_echo"),
+])
+def test_read_only_matches_mounted_tool_names(tmp_path, tool_mode, read_only, writable):
+    registry_path = tmp_path / "services.json"
+    registry_path.write_text(json.dumps(REGISTRY))
+    tools = list_composite_tools(str(registry_path), tool_mode)
+    assert read_only in tools and writable in tools
+
+    registry = ServiceRegistry(REGISTRY)
+    assert registry.is_read_only(read_only)
+    assert not registry.is_read_only(writable)
+
+
+def test_read_only_defaults():
+    registry = ServiceRegistry(DEFAULT_SERVICES)
+    # Read-only services: the sub-agent tool and every child tool
+    assert registry.is_read_only("sentry_sentry_tool")
+    assert registry.is_read_only("postgres_query")
+    # Elsewhere only cacheable child tools
+    assert not registry.is_read_only("redis_redis_tool")
+    assert registry.is_read_only("redis_get")
+    assert not registry.is_read_only("redis_set")
+    assert not registry.is_read_only("ping")
+
+
+def echo_through(service: dict) -> str:
+    """Call the stub's ``echo`` tool over a client built from a registry entry"""
+    (config,) = ServiceRegistry({"services": {"stub": {"enabled": True, **service}}}).enabled({})
+    (spec,) = config.child_specs({})
+    client = spec.create_client()
+
+    async def run():
+        await client.connect_to_server()
+        try:
+            result = await client.session.call_tool("echo", {"text": "hi"})
+            return result.content[0].text
+        finally:
+            await client.cleanup()
+
+    return asyncio.run(asyncio.wait_for(run(), 60))
+
+
+def test_command_args_and_env_reach_the_child():
+    service = {
+        "script": STUB_CHILD,
+        "command": sys.executable,
+        "args": ["--transport", "stdio"],
+        "env": {"STUB_CHILD_PREFIX": "custom", "STUB_CHILD_LATENCY": 0},
+    }
+    (spec,) = ServiceRegistry({"services": {"stub": service}}).services["stub"].child_specs({})
+    assert (spec.command, spec.args, spec.env) == (sys.executable, ["--transport", "stdio"], {"STUB_CHILD_PREFIX": "custom", "STUB_CHILD_LATENCY": "0"})
+
+    assert echo_through(service) == "custom: hi"
+
+
+def test_command_without_script():
+    assert echo_through({"command": sys.executable, "args": [STUB_CHILD], "env": {"STUB_CHILD_LATENCY": "0"}}) == "echo: hi"
+
+
+@pytest.mark.parametrize("service, error", [
+    ({"env": {}}, "needs a script or command"),
+    ({"command": "uvx", "args": "mcp-server-sentry"}, "must be a list"),
+])
+def test_invalid_launch_settings(service, error):
+    with pytest.raises(ValueError, match=error):
+        ServiceRegistry({"services": {"stub": service}})
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+from session_pool import SessionPool
+
+
+class StubSession:
+    def __init__(self):
+        self.healthy = True
+
+    async def send_ping(self):
+        if not self.healthy:
+            raise ConnectionError("ping failed")
+
+
+class StubClient:
+    """Records which task connected and which task cleaned it up"""
+
+    def __init__(self):
+        self.session = None
+        self.connected_in = None
+        self.cleaned_up_in = None
+
+    async def connect_to_server(self):
+        self.connected_in = asyncio.current_task()
+        self.session = StubSession()
+
+    async def cleanup(self):
+        self.cleaned_up_in = asyncio.current_task()
+
+
+def make_pool(**kwargs):
+    clients = []
+
+    def factory():
+        client = StubClient()
+        clients.append(client)
+        return client
+
+    return SessionPool(factory, health_check_interval=0, **kwargs), clients
+
+
+def test_min_size_is_connected_up_front():
+    async def run():
+        pool, clients = make_pool(min_size=2, max_size=4)
+        await pool.start()
+        assert (pool.size, pool.idle, len(clients)) == (2, 2, 2)
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_grows_up_to_max_size_then_waits():
+    async def run():
+        pool, clients = make_pool(min_size=0, max_size=2, acquire_timeout=0.1)
+        await pool.start()
+        first = await pool.acquire()
+        second = await pool.acquire()
+        assert pool.size == 2 and first is not second
+
+        with pytest.raises(TimeoutError):
+            await pool.acquire()
+
+        # A waiter gets the session released by another caller
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        await pool.release(first)
+        assert await waiter is first
+        assert len(clients) == 2
+
+        await pool.release(second)
+        await pool.release(first)
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_idle_sessions_are_reused():
+    async def run():
+        pool, clients = make_pool(min_size=1, max_size=4)
+        await pool.start()
+        for _ in range(3):
+            async with pool.session() as client:
+                assert client is clients[0]
+        assert len(clients) == 1
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_prefer_hands_out_the_given_idle_session():
+    async def run():
+        pool, clients = make_pool(min_size=3, max_size=3)
+        await pool.start()
+        for client in clients:
+            async with pool.session(prefer=client) as borrowed:
+                assert borrowed is client
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_unhealthy_session_is_replaced():
+    async def run():
+        pool, clients = make_pool(min_size=1, max_size=2)
+        await pool.start()
+        with pytest.raises(RuntimeError):
+            async with pool.session() as client:
+                client.session.healthy = False
+                raise RuntimeError("query failed")
+        # The failed session was health checked, closed and not put back
+        assert pool.size == 0 and client.cleaned_up_in is not None
+        async with pool.session() as replacement:
+            assert replacement is not client
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_health_loop_replaces_broken_idle_session():
+    async def run():
+        clients = []
+
+        def factory():
+            clients.append(StubClient())
+            return clients[-1]
+
+        pool = SessionPool(factory, min_size=1, max_size=1, health_check_interval=0.01)
+        await pool.start()
+        clients[0].session.healthy = False
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(clients) == 2 and pool.idle == 1:
+                break
+        assert len(clients) == 2 and clients[0].cleaned_up_in is not None
+        async with pool.session() as client:
+            assert client is clients[1]
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_close_cleans_up_in_the_owner_task():
+    async def run():
+        pool, clients = make_pool(min_size=2, max_size=2)
+        await pool.start()
+        await pool.close()
+        for client in clients:
+            assert client.cleaned_up_in is client.connected_in
+            assert client.connected_in.done()
+        assert pool.size == 0
+        with pytest.raises(RuntimeError):
+            await pool.acquire()
+
+    asyncio.run(run())
@@ -0,0 +1,111 @@
+import asyncio
+
+import mcp.types as types
+import pytest
+
+from single_flight import SingleFlight, SingleFlightToolCaller
+
+
+class CountingWork:
+    """Work that waits until released, counting how often it runs"""
+
+    def __init__(self, error: Exception = None):
+        self.runs = 0
+        self.release = asyncio.Event()
+        self.error = error
+
+    async def __call__(self):
+        self.runs += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return f"result {self.runs}"
+
+
+def test_identical_calls_run_once_and_share_the_result():
+    async def run():
+        flight = SingleFlight()
+        work = CountingWork()
+        callers = [asyncio.create_task(flight.do("key", work)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert flight.is_running("key") and flight.in_flight == 1
+        work.release.set()
+        results = await asyncio.gather(*callers)
+
+        assert results == ["result 1"] * 5 and work.runs == 1
+        assert flight.stats() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+        # Nothing is kept once the call is done
+        assert await flight.do("key", work) == "result 2"
+
+    asyncio.run(run())
+
+
+def test_different_keys_run_separately():
+    async def run():
+        flight = SingleFlight()
+        work = CountingWork()
+        work.release.set()
+        await asyncio.gather(flight.do("a", work), flight.do("b", work))
+        assert work.runs == 2 and flight.stats()["coalesced"] == 0
+
+    asyncio.run(run())
+
+
+def test_exception_reaches_every_waiter_and_is_not_cached():
+    async def run():
+        flight = SingleFlight()
+        failing = CountingWork(error=ConnectionError("child went away"))
+        callers = [asyncio.create_task(flight.do("key", failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        failing.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+
+        assert failing.runs == 1
+        assert all(isinstance(result, ConnectionError) for result in results)
+        assert flight.in_flight == 0
+
+        # The next call runs again instead of replaying the error
+        work = CountingWork()
+        work.release.set()
+        assert await flight.do("key", work) == "result 1"
+
+    asyncio.run(run())
+
+
+def test_work_is_cancelled_once_every_waiter_leaves():
+    async def run():
+        flight = SingleFlight()
+        work = CountingWork()
+        callers = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        (call,) = flight._calls.values()
+
+        callers[0].cancel()
+        await asyncio.sleep(0)
+        assert not call.task.cancelled()
+        callers[1].cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call.task
+        assert flight.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_tool_caller_only_shares_read_only_tools():
+    class Session:
+        def __init__(self):
+            self.calls = []
+
+        async def call_tool(self, name, arguments=None):
+            self.calls.append(name)
+            await asyncio.sleep(0.01)
+            return types.CallToolResult(content=[types.TextContent(type="text", text=name)])
+
+    async def run():
+        session = Session()
+        caller = SingleFlightToolCaller(session, SingleFlight(), "svc", lambda tool: tool == "get")
+        await asyncio.gather(*(caller.call_tool(tool, {"key": "k"}) for tool in ["get", "get", "set", "set"]))
+        return session.calls
+
+    assert sorted(asyncio.run(run())) == ["get", "set", "set"]
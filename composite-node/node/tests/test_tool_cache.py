@@ -0,0 +1,82 @@
+import asyncio
+
+import mcp.types as types
+
+import tool_cache
+from tool_cache import DEFAULT_CACHEABLE_TOOLS, CachingToolCaller, ToolResultCache
+
+
+def result(text: str, is_error: bool = False) -> types.CallToolResult:
+    return types.CallToolResult(content=[types.TextContent(type="text", text=text)], isError=is_error)
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tool_cache.time, "monotonic", lambda: now[0])
+    cache = ToolResultCache({"svc": {"fast": 10, "slow": 60}})
+    cache.put("svc", "fast", {"id": 1}, result("fast"))
+    cache.put("svc", "slow", {"id": 1}, result("slow"))
+
+    now[0] += 9
+    assert cache.get("svc", "fast", {"id": 1}).content[0].text == "fast"
+    now[0] += 1
+    assert cache.get("svc", "fast", {"id": 1}) is None
+    assert cache.get("svc", "slow", {"id": 1}).content[0].text == "slow"
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_is_evicted():
+    size = len(result("a").model_dump_json())
+    cache = ToolResultCache({"svc": {"tool": 60}}, max_bytes=size * 2)
+    cache.put("svc", "tool", {"n": "a"}, result("a"))
+    cache.put("svc", "tool", {"n": "b"}, result("b"))
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("svc", "tool", {"n": "a"}) is not None
+    cache.put("svc", "tool", {"n": "c"}, result("c"))
+
+    assert cache.get("svc", "tool", {"n": "b"}) is None
+    assert cache.get("svc", "tool", {"n": "a"}) is not None
+    assert cache.get("svc", "tool", {"n": "c"}) is not None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] <= size * 2
+
+
+def test_default_allowlist():
+    cache = ToolResultCache()
+    assert cache.cacheable_tools is DEFAULT_CACHEABLE_TOOLS
+    cache.put("redis", "get", {"key": "k"}, result("v"))
+    cache.put("redis", "set", {"key": "k", "value": "v"}, result("OK"))
+    cache.put("github", "create_issue", {"title": "t"}, result("created"))
+
+    assert cache.get("redis", "get", {"key": "k"}) is not None
+    assert cache.get("redis", "set", {"key": "k", "value": "v"}) is None
+    assert cache.get("github", "create_issue", {"title": "t"}) is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_argument_order_does_not_matter():
+    cache = ToolResultCache({"svc": {"tool": 60}})
+    cache.put("svc", "tool", {"a": 1, "b": 2}, result("ab"))
+    assert cache.get("svc", "tool", {"b": 2, "a": 1}) is not None
+
+
+def test_error_results_are_not_cached():
+    class FlakySession:
+        def __init__(self):
+            self.calls = 0
+
+        async def call_tool(self, name, arguments=None):
+            self.calls += 1
+            return result("boom", is_error=self.calls == 1)
+
+    session = FlakySession()
+    caller = CachingToolCaller(session, ToolResultCache({"svc": {"tool": 60}}), "svc")
+
+    async def run():
+        first = await caller.call_tool("tool", {})
+        second = await caller.call_tool("tool", {})
+        third = await caller.call_tool("tool", {})
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first.isError and not second.isError and third is second
+    assert session.calls == 2
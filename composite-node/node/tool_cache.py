@@ -0,0 +1,148 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import mcp.types as types
+
+# Read-only child tools that are safe to cache, with their TTLs in seconds.
+# Anything not listed here (e.g. Redis set/delete, GitHub writes) is never cached.
+DEFAULT_CACHEABLE_TOOLS: Dict[str, Dict[str, float]] = {
+    "sentry": {
+        "get_sentry_issue": 60,
+        "get_sentry_issues": 60,
+        "list_sentry_issues": 30,
+        "search_sentry_issues": 30,
+    },
+    "redis": {
+        "get": 10,
+        "list": 10,
+    },
+    "postgres": {
+        # The postgres server runs every query in a READ ONLY transaction
+        "query": 30,
+    },
+    "github": {
+        "get_file_contents": 120,
+        "search_repositories": 120,
+        "search_code": 120,
+        "search_issues": 60,
+        "search_users": 300,
+        "list_commits": 60,
+        "list_issues": 60,
+        "get_issue": 60,
+        "list_pull_requests": 60,
+        "get_pull_request": 60,
+        "get_pull_request_files": 60,
+        "get_pull_request_status": 30,
+        "get_pull_request_comments": 60,
+        "get_pull_request_reviews": 60,
+    },
+}
+
+CacheKey = Tuple[str, str, str]
+
+
+def canonical_arguments(arguments: Optional[dict]) -> str:
+    """Serialize tool arguments so equivalent calls produce the same key"""
+    return json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolResultCache:
+    """TTL + LRU cache of results from idempotent child tool calls.
+
+    Entries are keyed on (server, tool name, canonicalized arguments). Only tools
+    in the cacheability allowlist are stored, each with its own TTL, and the
+    least recently used entries are evicted once the cached results exceed
+    ``max_bytes``. Error results are never cached.
+    """
+
+    def __init__(self, cacheable_tools: Optional[Dict[str, Dict[str, float]]] = None, max_bytes: int = 64 * 1024 * 1024):
+        self.cacheable_tools = cacheable_tools if cacheable_tools is not None else DEFAULT_CACHEABLE_TOOLS
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, Tuple[float, int, types.CallToolResult]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def ttl(self, server: str, tool: str) -> Optional[float]:
+        """TTL for a tool, or None if its results must not be cached"""
+        return self.cacheable_tools.get(server, {}).get(tool)
+
+    def key(self, server: str, tool: str, arguments: Optional[dict]) -> CacheKey:
+        return (server, tool, canonical_arguments(arguments))
+
+    def get(self, server: str, tool: str, arguments: Optional[dict]) -> Optional[types.CallToolResult]:
+        """Return a fresh cached result, or None on a miss"""
+        if self.ttl(server, tool) is None:
+            return None
+        key = self.key(server, tool, arguments)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, _, result = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, server: str, tool: str, arguments: Optional[dict], result: types.CallToolResult):
+        """Store a result if the tool is cacheable and the call succeeded"""
+        ttl = self.ttl(server, tool)
+        if ttl is None or result.isError:
+            return
+        size = len(result.model_dump_json())
+        if size > self.max_bytes:
+            return
+        key = self.key(server, tool, arguments)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, result)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: CacheKey):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, server: Optional[str] = None):
+        """Drop every cached result, or only those of one server"""
+        for key in [key for key in self._entries if server is None or key[0] == server]:
+            self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+class CachingToolCaller:
+    """Wraps a ``ClientSession`` so ``call_tool`` is served from a ``ToolResultCache``"""
+
+    def __init__(self, session: Any, cache: ToolResultCache, server: str):
+        self.session = session
+        self.cache = cache
+        self.server = server
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None) -> types.CallToolResult:
+        result = self.cache.get(self.server, name, arguments)
+        if result is not None:
+            return result
+        result = await self.session.call_tool(name, arguments)
+        self.cache.put(self.server, name, arguments, result)
+        return result
@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional
+
+import mcp.types as types
+from mcp import ClientSession
+
+# Process-wide totals across every ToolCatalog
+_totals: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def catalog_stats() -> Dict[str, int]:
+    """Return process-wide tool catalog hit, miss and invalidation counts"""
+    return dict(_totals)
+
+
+class ToolCatalog:
+    """Caches a session's tool list and its Anthropic tool schemas.
+
+    The tool set of a connected server almost never changes, so ``list_tools`` is
+    only sent when the cache is empty. The cache is dropped when the server sends
+    ``notifications/tools/list_changed`` or when the client reconnects.
+
+    Anthropic tool schemas are sorted by name, so every session of a server
+    sends byte-identical tool definitions and the provider's prompt cache hits
+    whatever order the server lists them in.
+    """
+
+    def __init__(self):
+        self._tools: Optional[List[types.Tool]] = None
+        self._anthropic_tools: Optional[List[dict]] = None
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """Forget the cached tools so the next lookup refetches them"""
+        if self._tools is not None:
+            _totals["invalidations"] += 1
+        self._tools = None
+        self._anthropic_tools = None
+
+    async def refresh(self, session: ClientSession) -> List[types.Tool]:
+        """Fetch the tool list from the server and cache it"""
+        self.misses += 1
+        _totals["misses"] += 1
+        response = await session.list_tools()
+        self._tools = response.tools
+        self._anthropic_tools = [{
+            "name": tool.name,
+            "description": tool.description,
+            "input_schema": tool.inputSchema
+        } for tool in sorted(response.tools, key=lambda tool: tool.name)]
+        return self._tools
+
+    async def get_tools(self, session: ClientSession) -> List[types.Tool]:
+        """Return the server's MCP tools, listing them only on a cache miss"""
+        if self._tools is None:
+            return await self.refresh(session)
+        self.hits += 1
+        _totals["hits"] += 1
+        return self._tools
+
+    async def get_anthropic_tools(self, session: ClientSession) -> List[dict]:
+        """Return the server's tools converted to Anthropic tool schemas"""
+        await self.get_tools(session)
+        return self._anthropic_tools
+
+    async def handle_message(self, message) -> None:
+        """``ClientSession`` message handler that watches for tool list changes"""
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            self.invalidate()